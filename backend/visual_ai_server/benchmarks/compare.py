@@ -0,0 +1,73 @@
+"""Compare two benchmark result files and flag regressions.
+
+Usage::
+
+    python -m benchmarks.compare benchmarks/results/abc123.json benchmarks/results/def456.json
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Dict, Iterator, Tuple
+
+# Metrics where larger numbers are worse; everything else (rps) is better larger
+LATENCY_METRICS = ("p50_ms", "p95_ms", "p99_ms")
+THROUGHPUT_METRICS = ("rps",)
+# Fractions compared in absolute percentage points, since the baseline is often 0
+RATE_METRICS = ("rejection_rate",)
+
+
+def _rows(report: Dict) -> Iterator[Tuple[str, str, float]]:
+    for name, stats in report.get("micro", {}).items():
+        for metric in LATENCY_METRICS:
+            if metric in stats:
+                yield f"micro.{name}", metric, stats[metric]
+    for scenario, levels in report.get("load", {}).items():
+        for level, stats in levels.items():
+            for metric in LATENCY_METRICS + THROUGHPUT_METRICS + RATE_METRICS:
+                if metric in stats:
+                    yield f"load.{scenario}.{level}", metric, stats[metric]
+
+
+def compare(baseline: Dict, candidate: Dict, threshold: float) -> int:
+    """Print a side-by-side table and return the number of regressions."""
+    base_rows = {(name, metric): value for name, metric, value in _rows(baseline)}
+    regressions = 0
+
+    print(f"{'benchmark':<40} {'metric':<14} {'baseline':>10} {'candidate':>10} {'change':>8}")
+    for name, metric, value in _rows(candidate):
+        previous = base_rows.get((name, metric))
+        if previous is None:
+            continue
+        if metric in RATE_METRICS:
+            change = (value - previous) * 100.0
+            worse = change > threshold
+            unit = "pp"
+        else:
+            change = (value - previous) / previous * 100.0 if previous else 0.0
+            worse = change > threshold if metric in LATENCY_METRICS else change < -threshold
+            unit = "%"
+        flag = "  REGRESSION" if worse else ""
+        regressions += worse
+        print(f"{name:<40} {metric:<14} {previous:>10.2f} {value:>10.2f} "
+              f"{change:>+7.1f}{unit}{flag}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare benchmark results")
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("candidate", type=Path)
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="Percent change treated as a regression")
+    args = parser.parse_args(argv)
+
+    baseline = json.loads(args.baseline.read_text())
+    candidate = json.loads(args.candidate.read_text())
+    regressions = compare(baseline, candidate, args.threshold)
+    print(f"\n{regressions} regression(s) above {args.threshold:.0f}%")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,250 @@
+"""Synthetic model and image fixtures so benchmarks run fully offline.
+
+The generated TFLite model mirrors the real MobileNetV3-Small interface
+(``[1, 224, 224, 3]`` float input in ``[-1, 1]``, softmax scores over the
+label set) but is tiny: global average pooling followed by two fully
+connected layers. The hidden layer is exported as a second output so the
+embedding path can be exercised too. It is written directly as a TFLite flatbuffer, so only the
+``flatbuffers`` package is needed to build it.
+"""
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import cv2
+import flatbuffers
+import numpy as np
+
+# TFLite schema constants (tensorflow/lite/schema/schema.fbs)
+_FLOAT32 = 0
+_INT32 = 2
+_OP_FULLY_CONNECTED = 9
+_OP_SOFTMAX = 25
+_OP_MEAN = 40
+_OPTIONS_FULLY_CONNECTED = 8
+_OPTIONS_SOFTMAX = 9
+_OPTIONS_REDUCER = 27
+_ACTIVATION_RELU = 1
+
+EMBEDDING_SIZE = 64
+
+
+def _int_vector(builder: flatbuffers.Builder, values: List[int]) -> int:
+    builder.StartVector(4, len(values), 4)
+    for value in reversed(values):
+        builder.PrependInt32(value)
+    return builder.EndVector()
+
+
+def _offset_vector(builder: flatbuffers.Builder, offsets: List[int]) -> int:
+    builder.StartVector(4, len(offsets), 4)
+    for offset in reversed(offsets):
+        builder.PrependUOffsetTRelative(offset)
+    return builder.EndVector()
+
+
+def _buffer(builder: flatbuffers.Builder, data: Optional[np.ndarray]) -> int:
+    data_offset = None
+    if data is not None:
+        raw = data.tobytes()
+        builder.StartVector(1, len(raw), 16)
+        builder.head = builder.head - len(raw)
+        builder.Bytes[builder.head:builder.head + len(raw)] = raw
+        data_offset = builder.EndVector()
+
+    builder.StartObject(3)
+    if data_offset is not None:
+        builder.PrependUOffsetTRelativeSlot(0, data_offset, 0)
+    return builder.EndObject()
+
+
+def _tensor(builder: flatbuffers.Builder, name: str, shape: List[int],
+            dtype: int, buffer_index: int) -> int:
+    name_offset = builder.CreateString(name)
+    shape_offset = _int_vector(builder, shape)
+    builder.StartObject(8)
+    builder.PrependUOffsetTRelativeSlot(0, shape_offset, 0)
+    builder.PrependInt8Slot(1, dtype, 0)
+    builder.PrependUint32Slot(2, buffer_index, 0)
+    builder.PrependUOffsetTRelativeSlot(3, name_offset, 0)
+    return builder.EndObject()
+
+
+def _options(builder: flatbuffers.Builder, options_type: int, **fields) -> int:
+    if options_type == _OPTIONS_REDUCER:
+        builder.StartObject(1)
+        builder.PrependBoolSlot(0, fields.get("keep_dims", False), False)
+    elif options_type == _OPTIONS_FULLY_CONNECTED:
+        builder.StartObject(4)
+        builder.PrependInt8Slot(0, fields.get("activation", 0), 0)
+    else:
+        builder.StartObject(1)
+        builder.PrependFloat32Slot(0, 1.0, 0.0)
+    return builder.EndObject()
+
+
+def _operator(builder: flatbuffers.Builder, opcode_index: int, inputs: List[int],
+              outputs: List[int], options_type: int, **fields) -> int:
+    options_offset = _options(builder, options_type, **fields)
+    inputs_offset = _int_vector(builder, inputs)
+    outputs_offset = _int_vector(builder, outputs)
+    builder.StartObject(9)
+    builder.PrependUint32Slot(0, opcode_index, 0)
+    builder.PrependUOffsetTRelativeSlot(1, inputs_offset, 0)
+    builder.PrependUOffsetTRelativeSlot(2, outputs_offset, 0)
+    builder.PrependUint8Slot(3, options_type, 0)
+    builder.PrependUOffsetTRelativeSlot(4, options_offset, 0)
+    return builder.EndObject()
+
+
+def build_synthetic_model(num_classes: int, image_size: int = 224,
+                          embedding_size: int = EMBEDDING_SIZE,
+                          seed: int = 0) -> bytes:
+    """Build a deterministic TFLite classifier and return the flatbuffer bytes."""
+    rng = np.random.RandomState(seed)
+    constants = [
+        None,  # Buffer 0 is reserved as the empty buffer
+        np.array([1, 2], dtype=np.int32),
+        rng.standard_normal((embedding_size, 3)).astype(np.float32),
+        (rng.standard_normal(embedding_size) * 0.1).astype(np.float32),
+        (rng.standard_normal((num_classes, embedding_size)) * 8.0).astype(np.float32),
+        np.zeros(num_classes, dtype=np.float32),
+    ]
+
+    builder = flatbuffers.Builder(1024)
+    buffers = [_buffer(builder, data) for data in constants]
+
+    tensors = [
+        _tensor(builder, "input", [1, image_size, image_size, 3], _FLOAT32, 0),
+        _tensor(builder, "mean/axes", [2], _INT32, 1),
+        _tensor(builder, "pooled", [1, 3], _FLOAT32, 0),
+        _tensor(builder, "embedding/weights", [embedding_size, 3], _FLOAT32, 2),
+        _tensor(builder, "embedding/bias", [embedding_size], _FLOAT32, 3),
+        _tensor(builder, "embedding", [1, embedding_size], _FLOAT32, 0),
+        _tensor(builder, "logits/weights", [num_classes, embedding_size], _FLOAT32, 4),
+        _tensor(builder, "logits/bias", [num_classes], _FLOAT32, 5),
+        _tensor(builder, "logits", [1, num_classes], _FLOAT32, 0),
+        _tensor(builder, "scores", [1, num_classes], _FLOAT32, 0),
+    ]
+    operators = [
+        _operator(builder, 0, [0, 1], [2], _OPTIONS_REDUCER),
+        _operator(builder, 1, [2, 3, 4], [5], _OPTIONS_FULLY_CONNECTED,
+                  activation=_ACTIVATION_RELU),
+        _operator(builder, 1, [5, 6, 7], [8], _OPTIONS_FULLY_CONNECTED),
+        _operator(builder, 2, [8], [9], _OPTIONS_SOFTMAX),
+    ]
+
+    tensors_offset = _offset_vector(builder, tensors)
+    inputs_offset = _int_vector(builder, [0])
+    outputs_offset = _int_vector(builder, [9, 5])
+    operators_offset = _offset_vector(builder, operators)
+    subgraph_name = builder.CreateString("main")
+    builder.StartObject(5)
+    builder.PrependUOffsetTRelativeSlot(0, tensors_offset, 0)
+    builder.PrependUOffsetTRelativeSlot(1, inputs_offset, 0)
+    builder.PrependUOffsetTRelativeSlot(2, outputs_offset, 0)
+    builder.PrependUOffsetTRelativeSlot(3, operators_offset, 0)
+    builder.PrependUOffsetTRelativeSlot(4, subgraph_name, 0)
+    subgraph = builder.EndObject()
+
+    opcodes = []
+    for code in (_OP_MEAN, _OP_FULLY_CONNECTED, _OP_SOFTMAX):
+        builder.StartObject(4)
+        builder.PrependInt8Slot(0, code, 0)
+        builder.PrependInt32Slot(2, 1, 1)
+        builder.PrependInt32Slot(3, code, 0)
+        opcodes.append(builder.EndObject())
+
+    opcodes_offset = _offset_vector(builder, opcodes)
+    subgraphs_offset = _offset_vector(builder, [subgraph])
+    buffers_offset = _offset_vector(builder, buffers)
+    description = builder.CreateString("visual-ai synthetic benchmark model")
+    builder.StartObject(8)
+    builder.PrependUint32Slot(0, 3, 0)
+    builder.PrependUOffsetTRelativeSlot(1, opcodes_offset, 0)
+    builder.PrependUOffsetTRelativeSlot(2, subgraphs_offset, 0)
+    builder.PrependUOffsetTRelativeSlot(3, description, 0)
+    builder.PrependUOffsetTRelativeSlot(4, buffers_offset, 0)
+    model = builder.EndObject()
+    builder.Finish(model, file_identifier=b"TFL3")
+    return bytes(builder.Output())
+
+
+def write_images(directory: Path, count: int = 8, width: int = 640,
+                 height: int = 480, seed: int = 0) -> List[Path]:
+    """Write deterministic JPEG test images and return their paths."""
+    directory.mkdir(parents=True, exist_ok=True)
+    rng = np.random.RandomState(seed)
+    paths = []
+    for i in range(count):
+        # Smooth gradients plus noise compress like photos, unlike pure noise
+        y, x = np.mgrid[0:height, 0:width]
+        base = np.stack([x * 255 // width, y * 255 // height,
+                         (x + y) * 255 // (width + height)], axis=-1)
+        noise = rng.randint(-20, 20, size=base.shape)
+        image = np.clip(base + noise + i * 16, 0, 255).astype(np.uint8)
+        path = directory / f"synthetic_{i:02d}.jpg"
+        cv2.imwrite(str(path), image)
+        paths.append(path)
+    return paths
+
+
+def prepare(workdir: Path, labels_path: Optional[Path] = None,
+            image_count: int = 8) -> Dict[str, Path]:
+    """Create model, labels, images and a scratch database under ``workdir``."""
+    workdir = Path(workdir).absolute()
+    workdir.mkdir(parents=True, exist_ok=True)
+
+    labels_path = labels_path or Path(__file__).parent.parent / "models" / "labels.txt"
+    with open(labels_path, 'r') as f:
+        labels = [line.strip() for line in f.readlines()]
+    local_labels = workdir / "labels.txt"
+    local_labels.write_text("\n".join(labels) + "\n")
+
+    model_path = workdir / "synthetic.tflite"
+    model_path.write_bytes(build_synthetic_model(num_classes=len(labels)))
+
+    upload_dir = workdir / "uploads"
+    images = write_images(upload_dir, count=image_count)
+
+    database_path = workdir / "bench.db"
+    if database_path.exists():
+        database_path.unlink()
+
+    # Stored vectors are keyed by prediction id, so they go with the database
+    embeddings_dir = workdir / "embeddings"
+    shutil.rmtree(embeddings_dir, ignore_errors=True)
+
+    return {
+        "model": model_path,
+        "labels": local_labels,
+        "uploads": upload_dir,
+        "images": images,
+        "database": database_path,
+        "embeddings": embeddings_dir,
+    }
+
+
+def configure_environment(paths: Dict[str, Path], max_concurrency: int = 64) -> None:
+    """Point application settings at the fixtures; call before importing ``app``.
+
+    ``max_concurrency`` is the largest number of requests the load test keeps
+    in flight.
+    """
+    os.environ["MODEL_PATH"] = str(paths["model"])
+    os.environ["LABELS_PATH"] = str(paths["labels"])
+    os.environ["UPLOAD_DIR"] = str(paths["uploads"])
+    os.environ["DATABASE_URL"] = f"sqlite:///{paths['database']}"
+    os.environ["EMBEDDINGS_DIR"] = str(paths["embeddings"])
+    os.environ["DEBUG"] = "False"
+    # All load comes from one synthetic client; keep the per-client limit out
+    # of the way. Requests still go through the concurrency limit, but the
+    # queue holds every request in flight, so the load test measures queueing
+    # instead of shedding; rejections are reported separately.
+    os.environ["RATE_LIMIT_PER_SECOND"] = "0"
+    os.environ["ADMISSION_QUEUE_SIZE"] = str(max_concurrency)
+    os.environ["ADMISSION_QUEUE_TIMEOUT"] = "60"
+    # The load test cycles through a few images; keep result reuse off (the
+    # default) even if the environment enables it, so inference is measured.
+    os.environ["NEAR_DUPLICATE_THRESHOLD"] = "0"
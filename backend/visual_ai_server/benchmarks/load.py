@@ -0,0 +1,105 @@
+"""End-to-end load generator for the FastAPI application.
+
+Requests are sent either in-process through ``httpx.ASGITransport`` or to a
+running server when a base URL is given. Each scenario is run at several
+concurrency levels with a fixed number of requests per level.
+"""
+import asyncio
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+from .micro import CROP
+from .timing import summarize
+
+RequestFactory = Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]]
+
+
+def scenarios(images: List[Path]) -> Dict[str, RequestFactory]:
+    """Return the request factories exercised by the load test."""
+    def health(client: httpx.AsyncClient, i: int):
+        return client.get("/api/health")
+
+    def list_predictions(client: httpx.AsyncClient, i: int):
+        return client.get("/api/predictions/", params={"limit": 100})
+
+    def create_prediction(client: httpx.AsyncClient, i: int):
+        image = images[i % len(images)]
+        return client.post("/api/predictions/", json={
+            "image_path": str(image),
+            "bbox_left": CROP['left'],
+            "bbox_top": CROP['top'],
+            "bbox_right": CROP['right'],
+            "bbox_bottom": CROP['bottom'],
+        })
+
+    return {
+        "health": health,
+        "create_prediction": create_prediction,
+        "list_predictions": list_predictions,
+    }
+
+
+async def _run_level(client: httpx.AsyncClient, factory: RequestFactory,
+                     concurrency: int, requests: int) -> Dict[str, object]:
+    """Run one level. Latency percentiles and ``rps`` count 2xx responses only
+    (goodput), so shedding more requests never looks like a speed-up.
+    """
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    counter = iter(range(requests))
+
+    async def worker():
+        for i in counter:
+            start = time.perf_counter()
+            try:
+                response = await factory(client, i)
+                key = str(response.status_code)
+            except httpx.HTTPError as e:
+                key = type(e).__name__
+            if key.startswith("2"):
+                latencies.append((time.perf_counter() - start) * 1000.0)
+            statuses[key] = statuses.get(key, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    total = sum(statuses.values())
+    errors = total - len(latencies)
+    result = summarize(latencies)
+    result.update({
+        "concurrency": concurrency,
+        "elapsed_s": elapsed,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "errors": errors,
+        "rejection_rate": errors / total if total else 0.0,
+        "status_codes": statuses,
+    })
+    return result
+
+
+async def run(images: List[Path], concurrency_levels: List[int],
+              requests: int = 200, base_url: Optional[str] = None,
+              app=None) -> Dict[str, Dict[str, Dict[str, object]]]:
+    """Run every scenario at each concurrency level and collect statistics."""
+    if base_url:
+        client = httpx.AsyncClient(base_url=base_url, timeout=60.0)
+    else:
+        # Record server errors as 500s instead of re-raising them here
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        client = httpx.AsyncClient(transport=transport, base_url="http://bench",
+                                   timeout=60.0)
+
+    results: Dict[str, Dict[str, Dict[str, object]]] = {}
+    async with client:
+        for name, factory in scenarios(images).items():
+            # Warm up connections, caches and the interpreter
+            await _run_level(client, factory, 1, 5)
+            results[name] = {}
+            for concurrency in concurrency_levels:
+                results[name][f"c{concurrency}"] = await _run_level(
+                    client, factory, concurrency, requests)
+    return results
@@ -0,0 +1,65 @@
+"""Microbenchmarks for the individual stages of the inference pipeline."""
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from .timing import measure
+
+FULL_FRAME = {'left': 0.0, 'top': 0.0, 'right': 1.0, 'bottom': 1.0}
+CROP = {'left': 0.1, 'top': 0.2, 'right': 0.6, 'bottom': 0.9}
+
+
+def run(manager, images: List[Path], iterations: int = 200) -> Dict[str, Dict[str, float]]:
+    """Benchmark preprocessing, inference and post-processing separately.
+
+    ``manager`` must be an initialized ``ModelManager``.
+    """
+    image = images[0]
+    preprocessed = manager.preprocess_image(image, CROP)
+    manager.interpreter.set_tensor(manager.input_details[0]['index'], preprocessed)
+    manager.interpreter.invoke()
+    output = manager.interpreter.get_tensor(manager.output_details[0]['index'])
+
+    results = {
+        "preprocess_image.full_frame": measure(
+            lambda: manager.preprocess_image(image, FULL_FRAME), iterations),
+        "preprocess_image.crop": measure(
+            lambda: manager.preprocess_image(image, CROP), iterations),
+        "run_inference": measure(
+            lambda: manager.run_inference(preprocessed), iterations),
+        "postprocess": measure(
+            lambda: manager.postprocess(output), iterations),
+        "pipeline": measure(
+            lambda: manager.run_inference(manager.preprocess_image(image, CROP)),
+            iterations),
+    }
+    return results
+
+
+def search(directory: Path, dim: int, count: int = 100000,
+           iterations: int = 50) -> Dict[str, Dict[str, float]]:
+    """Benchmark a brute-force similarity search over ``count`` random vectors.
+
+    Measured with the configured float32 cache and with none, where every
+    query decodes the whole float16 file.
+    """
+    from app.core.config import settings
+    from app.core.similarity import EmbeddingStore
+
+    path = directory / f"bench-{dim}.f16"
+    store = EmbeddingStore(path, dim)
+    vectors = np.random.RandomState(0).standard_normal((count, dim)).astype(np.float16)
+    records = np.zeros(count, dtype=store.dtype)
+    records["id"] = np.arange(count)
+    records["vector"] = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    store.path.write_bytes(records.tobytes())
+
+    cached = EmbeddingStore(path, dim, settings.VECTOR_CACHE_SIZE)
+    query = vectors[0].astype(np.float32)
+    return {
+        f"similarity_search.{count}x{dim}": measure(
+            lambda: cached.search(query, k=10), iterations),
+        f"similarity_search.{count}x{dim}.uncached": measure(
+            lambda: store.search(query, k=10), iterations),
+    }
@@ -0,0 +1,139 @@
+"""Run the offline benchmark suite and save the results as JSON.
+
+Usage (from ``backend/visual_ai_server``)::
+
+    python -m benchmarks.run
+    python -m benchmarks.run --concurrency 1,8,32 --requests 500
+    python -m benchmarks.run --url http://localhost:8000 --skip-micro \
+        --workdir /srv/visual-ai-bench
+
+With ``--url`` the load test sends the server paths to the generated images,
+so the server must be able to read them: pass a ``--workdir`` it shares (the
+same host or a mounted volume). Nothing is started in-process in that case.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from . import fixtures
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+def git_revision() -> str:
+    """Return the short commit hash of the tree being benchmarked."""
+    try:
+        revision = subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+            stderr=subprocess.DEVNULL, text=True).strip()
+        dirty = subprocess.call(
+            ["git", "diff", "--quiet", "HEAD", "--", "."], cwd=ROOT,
+            stderr=subprocess.DEVNULL)
+        return f"{revision}-dirty" if dirty else revision
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workdir", type=Path, default=None,
+                        help="Directory for generated fixtures (default: temp dir); "
+                             "must be readable by the server with --url")
+    parser.add_argument("--iterations", type=int, default=200,
+                        help="Iterations per microbenchmark")
+    parser.add_argument("--requests", type=int, default=200,
+                        help="Requests per scenario and concurrency level")
+    parser.add_argument("--concurrency", default="1,4,16,64",
+                        help="Comma separated concurrency levels")
+    parser.add_argument("--url", default=None,
+                        help="Benchmark a running server instead of the in-process app")
+    parser.add_argument("--skip-micro", action="store_true")
+    parser.add_argument("--skip-load", action="store_true")
+    parser.add_argument("--output", type=Path, default=None,
+                        help="Result file (default: benchmarks/results/<revision>.json)")
+    return parser.parse_args(argv)
+
+
+async def _run(args: argparse.Namespace, paths) -> dict:
+    # Settings are read at import time, so the app is imported only after the
+    # environment points at the synthetic fixtures.
+    sys.path.insert(0, str(ROOT / "src"))
+    from app.core.model_manager import model_manager
+
+    results = {}
+    if not args.skip_micro:
+        from . import micro
+        if not model_manager.ready:
+            model_manager.load()
+        results["micro"] = micro.run(model_manager, paths["images"],
+                                     iterations=args.iterations)
+        results["micro"].update(micro.search(
+            paths["embeddings"], dim=model_manager.embedding_size or 64))
+    if not args.skip_load:
+        results["load"] = await _load(args, paths)
+    return results
+
+
+async def _load(args: argparse.Namespace, paths) -> dict:
+    from . import load
+    levels = [int(level) for level in args.concurrency.split(",")]
+    if args.url:
+        # The remote server runs its own model; nothing is started here
+        return await load.run(paths["images"], levels, requests=args.requests,
+                              base_url=args.url)
+
+    from main import app
+    async with app.router.lifespan_context(app):
+        await app.state.model_loader
+        return await load.run(paths["images"], levels, requests=args.requests,
+                              app=app)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if args.url and not args.skip_load and args.workdir is None:
+        print("warning: --url without --workdir sends image paths in a local temp "
+              "dir; the server must be able to read them", file=sys.stderr)
+    with tempfile.TemporaryDirectory(prefix="visual-ai-bench-") as tmp:
+        paths = fixtures.prepare(args.workdir or Path(tmp))
+        levels = [int(level) for level in args.concurrency.split(",")]
+        fixtures.configure_environment(paths, max_concurrency=max(levels))
+
+        started = time.time()
+        results = asyncio.run(_run(args, paths))
+
+    import numpy as np
+
+    revision = git_revision()
+    report = {
+        "meta": {
+            "revision": revision,
+            "timestamp": started,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "target": args.url or "asgi",
+            "iterations": args.iterations,
+            "requests": args.requests,
+        },
+        **results,
+    }
+
+    output = args.output or RESULTS_DIR / f"{revision}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, sort_keys=True))
+    print(f"Results written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
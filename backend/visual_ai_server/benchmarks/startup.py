@@ -0,0 +1,190 @@
+"""Startup latency and per-worker memory of the server modes.
+
+Usage (from ``backend/visual_ai_server``, Linux only)::
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --workers 2,4 --modes prefork
+
+Each mode is started as a subprocess on the synthetic fixtures and measured:
+
+- time from launch until ``/api/health`` first answers, and until it reports
+  the model ready;
+- RSS, PSS and USS of every process after a short warm-up. PSS splits shared
+  pages between the processes that map them, so the PSS total is the real
+  memory cost. RSS counts shared pages once per process and overstates it.
+"""
+import argparse
+import json
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+
+from . import fixtures
+from .run import RESULTS_DIR, ROOT, git_revision
+
+MODES = {
+    "uvicorn": lambda port, workers: [
+        sys.executable, "-m", "uvicorn", "main:app", "--port", str(port),
+        "--workers", str(workers), "--log-level", "warning"],
+    "prefork": lambda port, workers: [
+        sys.executable, "server.py", "--port", str(port),
+        "--workers", str(workers), "--log-level", "warning"],
+}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _process_tree(root: int) -> List[int]:
+    """Return ``root`` and all its descendants, from ``/proc``."""
+    parents: Dict[int, int] = {}
+    for entry in Path("/proc").iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            stat = (entry / "stat").read_text()
+        except OSError:
+            continue
+        # The command name may contain spaces; fields resume after the last ')'
+        parents[int(entry.name)] = int(stat.rsplit(")", 1)[1].split()[1])
+
+    tree = [root]
+    for pid in tree:
+        tree.extend(child for child, parent in parents.items() if parent == pid)
+    return tree
+
+
+def memory_usage(pid: int) -> Dict[str, float]:
+    """Return RSS, PSS and USS of ``pid`` in MiB."""
+    fields = {}
+    for line in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines()[1:]:
+        name, value = line.split(":", 1)
+        fields[name] = int(value.split()[0])
+    uss = fields["Private_Clean"] + fields["Private_Dirty"]
+    return {
+        "rss_mib": fields["Rss"] / 1024,
+        "pss_mib": fields["Pss"] / 1024,
+        "uss_mib": uss / 1024,
+    }
+
+
+def _wait_for(url: str, ready, deadline: float) -> float:
+    while time.monotonic() < deadline:
+        try:
+            response = httpx.get(url, timeout=0.5)
+            if ready(response):
+                return time.monotonic()
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.002)
+    raise TimeoutError(f"{url} did not become ready")
+
+
+def measure(mode: str, workers: int, paths, warmup: int = 20,
+            timeout: float = 60.0) -> Dict[str, object]:
+    """Start the server in ``mode`` with ``workers`` and measure it."""
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    env = {**os.environ, "WORKERS": str(workers)}
+
+    started = time.monotonic()
+    process = subprocess.Popen(MODES[mode](port, workers), cwd=ROOT / "src", env=env,
+                               start_new_session=True)
+    try:
+        deadline = started + timeout
+        health = _wait_for(f"{base_url}/api/health",
+                           lambda r: r.status_code == 200, deadline)
+        # Health is answered before the model has loaded; wait for that too
+        ready = _wait_for(f"{base_url}/api/health",
+                          lambda r: r.json().get("model") == "ready", deadline)
+
+        with httpx.Client(base_url=base_url, timeout=10.0) as client:
+            for i in range(warmup):
+                client.post("/api/predictions/", json={
+                    "image_path": str(paths["images"][i % len(paths["images"])]),
+                    "bbox_left": 0.0, "bbox_top": 0.0,
+                    "bbox_right": 1.0, "bbox_bottom": 1.0,
+                })
+        # Let late workers finish loading before sampling memory
+        time.sleep(1.0)
+
+        processes = {}
+        for pid in _process_tree(process.pid):
+            try:
+                processes[pid] = memory_usage(pid)
+            except (FileNotFoundError, ProcessLookupError):
+                pass  # Exited since the tree was read
+    finally:
+        os.killpg(process.pid, signal.SIGTERM)
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            os.killpg(process.pid, signal.SIGKILL)
+            process.wait()
+
+    return {
+        "health_ms": (health - started) * 1000.0,
+        "ready_ms": (ready - started) * 1000.0,
+        "processes": len(processes),
+        "total_rss_mib": sum(p["rss_mib"] for p in processes.values()),
+        "total_pss_mib": sum(p["pss_mib"] for p in processes.values()),
+        "per_process": {str(pid): usage for pid, usage in processes.items()},
+    }
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", default="1,4",
+                        help="Comma separated worker counts")
+    parser.add_argument("--modes", default=",".join(MODES),
+                        help=f"Comma separated modes from: {', '.join(MODES)}")
+    parser.add_argument("--warmup", type=int, default=20,
+                        help="Prediction requests sent before sampling memory")
+    parser.add_argument("--output", type=Path, default=None,
+                        help="Result file (default: benchmarks/results/<revision>-startup.json)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    results: Dict[str, Dict[str, object]] = {}
+    with tempfile.TemporaryDirectory(prefix="visual-ai-startup-") as tmp:
+        paths = fixtures.prepare(Path(tmp))
+        fixtures.configure_environment(paths)
+
+        for mode in args.modes.split(","):
+            for workers in (int(count) for count in args.workers.split(",")):
+                # A fresh database and vector store for every run
+                paths["database"].unlink(missing_ok=True)
+                shutil.rmtree(paths["embeddings"], ignore_errors=True)
+                result = measure(mode, workers, paths, warmup=args.warmup)
+                results.setdefault(mode, {})[str(workers)] = result
+                print(f"{mode:8s} workers={workers}: health {result['health_ms']:.0f} ms, "
+                      f"ready {result['ready_ms']:.0f} ms, "
+                      f"PSS {result['total_pss_mib']:.1f} MiB, "
+                      f"RSS {result['total_rss_mib']:.1f} MiB "
+                      f"over {result['processes']} processes")
+
+    revision = git_revision()
+    output = args.output or RESULTS_DIR / f"{revision}-startup.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({"meta": {"revision": revision}, "startup": results},
+                                 indent=2, sort_keys=True))
+    print(f"Results written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
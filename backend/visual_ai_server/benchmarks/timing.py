@@ -0,0 +1,45 @@
+"""Timing helpers shared by the micro and load benchmarks."""
+import math
+import statistics
+import time
+from typing import Callable, Dict, List
+
+
+def percentile(sorted_samples: List[float], pct: float) -> float:
+    """Return the nearest-rank percentile of already sorted samples."""
+    if not sorted_samples:
+        return 0.0
+    rank = max(0, min(len(sorted_samples) - 1,
+                      math.ceil(pct / 100.0 * len(sorted_samples)) - 1))
+    return sorted_samples[rank]
+
+
+def summarize(samples_ms: List[float]) -> Dict[str, float]:
+    """Summarize latency samples (milliseconds) into comparable statistics."""
+    ordered = sorted(samples_ms)
+    if not ordered:
+        return {"count": 0}
+    return {
+        "count": len(ordered),
+        "mean_ms": statistics.fmean(ordered),
+        "stdev_ms": statistics.stdev(ordered) if len(ordered) > 1 else 0.0,
+        "min_ms": ordered[0],
+        "p50_ms": percentile(ordered, 50),
+        "p95_ms": percentile(ordered, 95),
+        "p99_ms": percentile(ordered, 99),
+        "max_ms": ordered[-1],
+    }
+
+
+def measure(func: Callable[[], object], iterations: int,
+            warmup: int = 5) -> Dict[str, float]:
+    """Call ``func`` repeatedly and summarize its wall-clock latency."""
+    for _ in range(warmup):
+        func()
+
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000.0)
+    return summarize(samples)
@@ -0,0 +1,210 @@
+"""Admission control for inference endpoints.
+
+Requests to protected routes pass two checks before reaching the app:
+
+1. A per-client token bucket (HTTP 429 when empty).
+2. A global concurrency limit sized from inference capacity, with a short
+   bounded wait queue (HTTP 503 when the queue is full or the wait times out).
+
+Both rejections carry ``Retry-After`` so clients back off instead of piling
+on. Token-bucket state lives behind :class:`RateLimitStore`, so the in-memory
+store can be swapped for a shared one when running several workers or hosts.
+"""
+import asyncio
+import math
+from abc import ABC, abstractmethod
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Optional, Tuple
+
+from starlette.responses import JSONResponse
+
+from .metrics import admission_active, admission_queue_depth, admission_requests
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be admitted; ``reason`` names the cause."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class RateLimitStore(ABC):
+    """Token-bucket storage. Implement ``take`` for a shared backend."""
+
+    @abstractmethod
+    async def take(self, key: str, rate: float, burst: int) -> float:
+        """Take one token for ``key``.
+
+        Returns ``0`` when the request is allowed, otherwise the number of
+        seconds until a token becomes available.
+        """
+
+
+class InMemoryRateLimitStore(RateLimitStore):
+    """Per-process token buckets, evicting the least recently seen clients."""
+
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def take(self, key: str, rate: float, burst: int) -> float:
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(key, (float(burst), now))
+        tokens = min(float(burst), tokens + (now - updated) * rate)
+
+        if tokens >= 1.0:
+            tokens -= 1.0
+            wait = 0.0
+        else:
+            wait = (1.0 - tokens) / rate
+
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+    def clear(self) -> None:
+        self._buckets.clear()
+
+
+def create_rate_limit_store(backend: str) -> RateLimitStore:
+    """Build the rate-limit store named by the ``RATE_LIMIT_STORE`` setting."""
+    if backend == "memory":
+        return InMemoryRateLimitStore()
+    raise ValueError(f"Unknown rate limit store: {backend}")
+
+
+class ConcurrencyLimiter:
+    """Async semaphore with a bounded FIFO wait queue and a wait timeout."""
+
+    def __init__(self, limit: int, queue_size: int, queue_timeout: float):
+        self.limit = max(1, limit)
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    def _update_gauges(self) -> None:
+        admission_active.set(self.active)
+        admission_queue_depth.set(len(self._waiters))
+
+    async def acquire(self) -> None:
+        """Take a slot, waiting in the queue if needed; raise when shedding."""
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self._update_gauges()
+            return
+
+        if len(self._waiters) >= self.queue_size:
+            raise AdmissionRejected("queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._update_gauges()
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._discard(waiter)
+            raise AdmissionRejected("queue_timeout")
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as the client went away
+                self.release()
+            else:
+                self._discard(waiter)
+            raise
+
+    def _discard(self, waiter: asyncio.Future) -> None:
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+        self._update_gauges()
+
+    def release(self) -> None:
+        """Hand the slot to the next waiter, or free it."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                self._update_gauges()
+                return
+        self.active -= 1
+        self._update_gauges()
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying rate and concurrency limits to inference routes."""
+
+    def __init__(self, app, limiter: ConcurrencyLimiter, store: RateLimitStore,
+                 rate: float, burst: int, methods: Tuple[str, ...] = ("POST",),
+                 prefixes: Tuple[str, ...] = ("/api/predictions",),
+                 trust_forwarded_for: bool = False, trusted_proxies: int = 1):
+        self.app = app
+        self.limiter = limiter
+        self.store = store
+        self.rate = rate
+        self.burst = burst
+        self.methods = methods
+        self.prefixes = prefixes
+        self.trust_forwarded_for = trust_forwarded_for
+        self.trusted_proxies = max(1, trusted_proxies)
+
+    def client_key(self, scope) -> str:
+        """Identify the client by peer address, or by X-Forwarded-For when trusted.
+
+        Proxies append the address they received the request from, so only
+        the last ``trusted_proxies`` entries were written by trusted hosts.
+        Entries before them come from the client and may be forged; the key
+        is the entry the outermost trusted proxy appended.
+        """
+        if self.trust_forwarded_for:
+            hops = [
+                hop.strip()
+                for name, value in scope["headers"] if name == b"x-forwarded-for"
+                for hop in value.decode("latin-1").split(",") if hop.strip()
+            ]
+            if len(hops) >= self.trusted_proxies:
+                return hops[-self.trusted_proxies]
+        client: Optional[Tuple[str, int]] = scope.get("client")
+        return client[0] if client else "unknown"
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or scope["method"] not in self.methods
+                or not scope["path"].startswith(self.prefixes)):
+            await self.app(scope, receive, send)
+            return
+
+        if self.rate > 0:
+            wait = await self.store.take(self.client_key(scope), self.rate, self.burst)
+            if wait > 0:
+                admission_requests.inc(result="rate_limited")
+                await self._reject(scope, receive, send, 429, "Rate limit exceeded", wait)
+                return
+
+        try:
+            await self.limiter.acquire()
+        except AdmissionRejected as e:
+            admission_requests.inc(result=e.reason)
+            await self._reject(scope, receive, send, 503,
+                               "Server is at inference capacity, retry later",
+                               self.limiter.queue_timeout)
+            return
+
+        admission_requests.inc(result="admitted")
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.limiter.release()
+
+    @staticmethod
+    async def _reject(scope, receive, send, status: int, detail: str,
+                      retry_after: float) -> None:
+        response = JSONResponse(
+            {"detail": detail},
+            status_code=status,
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+        await response(scope, receive, send)
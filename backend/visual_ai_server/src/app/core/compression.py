@@ -0,0 +1,163 @@
+"""Response compression with Brotli when available and gzip otherwise.
+
+Only textual responses (JSON, text) above a size threshold are compressed;
+images are already compressed and small bodies are not worth the CPU.
+Compressed request bodies (gzip or deflate) are decoded by
+:func:`decompress_body`.
+"""
+import gzip
+import zlib
+from typing import List, Optional
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; fall back to gzip only
+    brotli = None
+
+COMPRESSIBLE_TYPES = (b"application/json", b"text/")
+
+# zlib window bits selecting the container format of each request encoding
+_REQUEST_ENCODINGS = {"gzip": 16 + zlib.MAX_WBITS, "deflate": zlib.MAX_WBITS}
+
+
+class UnsupportedEncodingError(ValueError):
+    """Raised for a request Content-Encoding that cannot be decoded."""
+
+
+class BodyTooLargeError(ValueError):
+    """Raised when a request body decodes to more than the allowed size."""
+
+
+def _qvalue(params: List[str]) -> float:
+    """Return the ``q`` weight of one Accept-Encoding entry; invalid weights refuse it."""
+    for param in params:
+        name, _, value = param.partition("=")
+        if name.strip() == "q":
+            try:
+                return float(value.strip())
+            except ValueError:
+                return 0.0
+    return 1.0
+
+
+def _accepted_encodings(headers) -> List[str]:
+    """Return the encodings the client accepts, per RFC 9110 section 12.5.3.
+
+    Entries weighted ``q=0`` (in any spelling, e.g. ``q=0.0``) are refused.
+    A ``*`` entry accepts every encoding the client does not list itself.
+    """
+    for name, value in headers:
+        if name == b"accept-encoding":
+            weights = {}
+            for part in value.decode("latin-1").lower().split(","):
+                coding, *params = part.split(";")
+                if coding.strip():
+                    weights[coding.strip()] = _qvalue(params)
+            accepted = [coding for coding, q in weights.items() if q > 0]
+            if weights.get("*", 0) > 0:
+                accepted += [coding for coding in ("br", "gzip") if coding not in weights]
+            return accepted
+    return []
+
+
+def choose_encoding(accepted: List[str]) -> Optional[str]:
+    """Pick the best encoding supported by both the client and the server."""
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str, gzip_level: int = 6,
+             brotli_quality: int = 4) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=brotli_quality)
+    return gzip.compress(body, compresslevel=gzip_level)
+
+
+def decompress_body(body: bytes, encoding: Optional[str], max_size: int) -> bytes:
+    """Decode a request body sent with ``encoding``, at most ``max_size`` bytes.
+
+    Output is capped while decoding, so small compressed bodies cannot expand
+    without bound. Raises ``ValueError`` for corrupt data.
+    """
+    encoding = (encoding or "identity").strip().lower()
+    if encoding == "identity":
+        data = body
+    elif encoding in _REQUEST_ENCODINGS:
+        decoder = zlib.decompressobj(_REQUEST_ENCODINGS[encoding])
+        try:
+            data = decoder.decompress(body, max_size + 1)
+        except zlib.error as e:
+            raise ValueError(f"Invalid {encoding} body: {e}")
+        if len(data) <= max_size and not decoder.eof:
+            raise ValueError(f"Truncated {encoding} body")
+    else:
+        raise UnsupportedEncodingError(f"Unsupported Content-Encoding: {encoding}")
+
+    if len(data) > max_size:
+        raise BodyTooLargeError(f"Request body exceeds {max_size} bytes")
+    return data
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing textual responses of at least ``minimum_size``."""
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6,
+                 brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(_accepted_encodings(scope["headers"]))
+        if encoding is None or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        chunks: List[bytes] = []
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                headers = dict(message.get("headers", []))
+                content_type = headers.get(b"content-type", b"")
+                if (b"content-encoding" in headers
+                        or not content_type.startswith(COMPRESSIBLE_TYPES)):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start_message = message
+                return
+
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+
+            body = b"".join(chunks)
+            headers = [
+                (name, value) for name, value in start_message.get("headers", [])
+                if name != b"content-length"
+            ]
+            if len(body) >= self.minimum_size:
+                body = compress(body, encoding, self.gzip_level, self.brotli_quality)
+                headers.append((b"content-encoding", encoding.encode()))
+                headers.append((b"vary", b"Accept-Encoding"))
+            headers.append((b"content-length", str(len(body)).encode()))
+
+            await send({**start_message, "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
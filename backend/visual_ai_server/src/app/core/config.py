@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from pathlib import Path
+from typing import Optional
 
 class Settings(BaseSettings):
     # API Settings
@@ -28,11 +29,41 @@ class Settings(BaseSettings):
     CACHE_TTL: int = 3600  # 1 hour
     MAX_CACHE_SIZE: int = 1000
 
+    # Similarity Settings
+    EMBEDDINGS_DIR: Path = Path("embeddings")  # Keyed by prediction id; keep with the DB
+    EMBEDDING_TENSOR: str = ""  # Tensor name; empty uses the model's second output
+    VECTOR_CACHE_SIZE: int = 32 * 1024 * 1024  # float32 bytes per store and worker; rest is scanned
+    NEAR_DUPLICATE_THRESHOLD: float = 0.0  # Crop similarity to reuse a result, e.g. 0.999; 0 disables
+
+    # Admission Control Settings (POST /api/predictions)
+    RATE_LIMIT_PER_SECOND: float = 5.0  # Per client; 0 disables rate limiting
+    RATE_LIMIT_BURST: int = 20
+    RATE_LIMIT_STORE: str = "memory"  # Token-bucket backend, see admission.py
+    ADMISSION_MAX_CONCURRENT: int = 0  # 0 sizes the limit from inference capacity
+    ADMISSION_QUEUE_SIZE: int = 8
+    ADMISSION_QUEUE_TIMEOUT: float = 2.0  # Seconds a request may wait for a slot
+    TRUST_FORWARDED_FOR: bool = False  # Key clients by X-Forwarded-For behind a proxy
+    TRUSTED_PROXIES: int = 1  # Proxies in front of the server that append to X-Forwarded-For
+
+    # Sync Settings (offline clients)
+    SYNC_MAX_RECORDS: int = 1000  # Records per upload batch
+    SYNC_MAX_BODY_SIZE: int = 10 * 1024 * 1024  # Decompressed request bytes
+    SYNC_PAGE_SIZE: int = 500  # Changes returned per response
+
+    # Response Settings
+    COMPRESSION_MIN_SIZE: int = 1024  # Bytes; smaller responses are sent as-is
+    GZIP_LEVEL: int = 6
+    BROTLI_QUALITY: int = 4
+
+    # Diagnostics Settings
+    ADMIN_TOKEN: str = ""  # Admin endpoints are disabled while empty
+    PROFILE_MAX_SECONDS: float = 60.0
+    PROFILE_SIGNAL_SECONDS: float = 10.0
+    PROFILE_DIR: Path = Path("logs/profiles")
+    METRICS_DIR: Optional[Path] = None  # Workers aggregate /metrics here; server.py sets one
+
     class Config:
         case_sensitive = True
         env_file = ".env"
 
-settings = Settings()
-
-# Ensure required directories exist
-settings.UPLOAD_DIR.mkdir(parents=True, exist_ok=True) 
\ No newline at end of file
+settings = Settings() 
\ No newline at end of file
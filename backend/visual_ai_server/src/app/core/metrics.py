@@ -0,0 +1,369 @@
+"""In-process metrics with Prometheus text exposition and Server-Timing support.
+
+Stage timings are recorded with :func:`stage`, which both feeds the
+``visual_ai_stage_duration_seconds`` histogram and, when called inside a
+request handled by :class:`MetricsMiddleware`, adds an entry to that
+response's ``Server-Timing`` header.
+
+With several worker processes, each has its own values. Once
+:meth:`Registry.enable_multiprocess` is called, every worker writes a
+snapshot of its values to a shared directory about once a second, and
+``/metrics`` on any worker renders the sum over all snapshots. Counters and
+histograms of workers that have exited are kept, so totals never go back;
+gauges only count live workers.
+"""
+import copy
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Seconds; covers sub-millisecond stages up to slow end-to-end requests
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: LabelValues,
+                   extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class _Metric(ABC):
+    """Base class holding one value per label combination."""
+
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[LabelValues, object] = {}
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abstractmethod
+    def _samples(self, values: Dict[LabelValues, object]) -> Iterator[str]:
+        """Yield exposition lines for ``values``."""
+
+    def snapshot(self) -> List[list]:
+        """Return ``[label values, value]`` pairs that can be stored as JSON."""
+        with self._lock:
+            return [[list(key), copy.deepcopy(value)] for key, value in self._values.items()]
+
+    @staticmethod
+    def _add(total: object, value: object) -> object:
+        return total + value
+
+    def render(self, snapshots: Optional[List[List[list]]] = None) -> str:
+        """Render this process's values, or the sum of ``snapshots``."""
+        lines = [f"# HELP {self.name} {self.documentation}",
+                 f"# TYPE {self.name} {self.type}"]
+        if snapshots is None:
+            with self._lock:
+                lines.extend(self._samples(self._values))
+        else:
+            values: Dict[LabelValues, object] = {}
+            for snapshot in snapshots:
+                for key, value in snapshot:
+                    key = tuple(key)
+                    values[key] = self._add(values[key], value) if key in values else value
+            lines.extend(self._samples(values))
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self, values: Dict[LabelValues, object]) -> Iterator[str]:
+        for key, value in values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    @contextmanager
+    def track(self, **labels: str) -> Iterator[None]:
+        """Increment the gauge for the duration of the block."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def count(self, **labels: str) -> int:
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    @staticmethod
+    def _add(total: list, value: list) -> list:
+        return [[a + b for a, b in zip(total[0], value[0])],
+                total[1] + value[1], total[2] + value[2]]
+
+    def _samples(self, values: Dict[LabelValues, object]) -> Iterator[str]:
+        for key, (bucket_counts, total, count) in values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(bound)))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {count}"
+
+
+class Registry:
+    """Collection of metrics rendered together on the ``/metrics`` endpoint."""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self.directory: Optional[Path] = None
+        self.pid = os.getpid()
+        self._flusher: Optional[threading.Thread] = None
+        self._write_lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def enable_multiprocess(self, directory: Path, interval: float = 1.0) -> None:
+        """Share values with the other workers through ``directory``.
+
+        Call in every worker after it has started (threads do not survive a
+        fork). The directory must be emptied when the server starts.
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.pid = os.getpid()
+        self.write_snapshot()
+        if interval > 0 and self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush, args=(interval,),
+                                             name="metrics-flush", daemon=True)
+            self._flusher.start()
+
+    def _flush(self, interval: float) -> None:
+        while True:
+            time.sleep(interval)
+            self.write_snapshot()
+
+    def write_snapshot(self) -> None:
+        """Write this process's values for the other workers to read."""
+        data = {"pid": self.pid,
+                "metrics": {metric.name: metric.snapshot() for metric in self._metrics}}
+        path = self.directory / f"{self.pid}.json"
+        tmp = path.with_suffix(".tmp")
+        with self._write_lock:
+            tmp.write_text(json.dumps(data))
+            # Atomic, so readers never see a partial file
+            os.replace(tmp, path)
+
+    def _read_snapshots(self) -> List[dict]:
+        snapshots = []
+        for path in self.directory.glob("*.json"):
+            try:
+                snapshots.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                continue  # Replaced or removed meanwhile
+        return snapshots
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        if self.directory is None:
+            return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+        self.write_snapshot()
+        snapshots = self._read_snapshots()
+        live = {snapshot["pid"] for snapshot in snapshots if _alive(snapshot["pid"])}
+        rendered = []
+        for metric in self._metrics:
+            parts = [snapshot["metrics"].get(metric.name, []) for snapshot in snapshots
+                     if metric.type != "gauge" or snapshot["pid"] in live]
+            rendered.append(metric.render(parts))
+        return "\n".join(rendered) + "\n"
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+registry = Registry()
+
+http_requests = registry.counter(
+    "visual_ai_http_requests_total", "HTTP requests handled.",
+    ("method", "route", "status"))
+http_errors = registry.counter(
+    "visual_ai_http_request_errors_total",
+    "HTTP requests that failed with a server error.", ("method", "route"))
+http_duration = registry.histogram(
+    "visual_ai_http_request_duration_seconds", "End-to-end HTTP request latency.",
+    ("method", "route"))
+http_in_flight = registry.gauge(
+    "visual_ai_http_requests_in_flight",
+    "Requests currently being handled, including those waiting on inference.")
+stage_duration = registry.histogram(
+    "visual_ai_stage_duration_seconds", "Latency of individual pipeline stages.",
+    ("stage",))
+inference_in_progress = registry.gauge(
+    "visual_ai_interpreters_in_use", "TFLite interpreters currently running inference.")
+interpreter_pool_size = registry.gauge(
+    "visual_ai_interpreters_total", "TFLite interpreters available for inference.")
+cache_requests = registry.counter(
+    "visual_ai_cache_requests_total", "Prediction cache lookups.", ("result",))
+admission_requests = registry.counter(
+    "visual_ai_admission_requests_total",
+    "Admission decisions for inference requests.", ("result",))
+admission_active = registry.gauge(
+    "visual_ai_admission_active", "Inference requests currently admitted.")
+admission_queue_depth = registry.gauge(
+    "visual_ai_admission_queue_depth", "Inference requests waiting for a slot.")
+sync_records = registry.counter(
+    "visual_ai_sync_records_total", "Records uploaded through the sync API.", ("result",))
+
+_server_timing: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar(
+    "server_timing", default=None)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a pipeline stage and record it as a metric and Server-Timing entry."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        stage_duration.observe(elapsed, stage=name)
+        timings = _server_timing.get()
+        if timings is not None:
+            timings.append((name, elapsed))
+
+
+def format_server_timing(timings: List[Tuple[str, float]]) -> str:
+    """Format ``(name, seconds)`` pairs as a Server-Timing header value."""
+    return ", ".join(f"{name};dur={elapsed * 1000.0:.3f}" for name, elapsed in timings)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request metrics and the Server-Timing header."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings: List[Tuple[str, float]] = []
+        token = _server_timing.set(timings)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                timings.append(("total", time.perf_counter() - start))
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing",
+                                format_server_timing(timings).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        http_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_in_flight.dec()
+            _server_timing.reset(token)
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            http_duration.observe(time.perf_counter() - start,
+                                  method=method, route=route_path)
+            http_requests.inc(method=method, route=route_path, status=str(status))
+            if status >= 500:
+                http_errors.inc(method=method, route=route_path)
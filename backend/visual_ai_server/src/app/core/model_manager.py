@@ -1,77 +1,162 @@
-import numpy as np
-from PIL import Image
-import tflite_runtime.interpreter as tflite
+from __future__ import annotations
+
+import math
 from pathlib import Path
-from typing import List, Dict, Tuple
-import cv2
+from typing import TYPE_CHECKING, List, Dict, Optional, Tuple
 
 from .config import settings
+from .metrics import inference_in_progress, interpreter_pool_size, stage
+
+# NumPy, OpenCV and the TFLite runtime are imported where they are used so
+# that importing the app (and answering /api/health) does not wait for them.
+if TYPE_CHECKING:
+    import numpy as np
 
 class ModelManager:
     def __init__(self):
         self.interpreter = None
         self.labels = []
+        self.model_content: Optional[bytes] = None
         self.input_details = None
         self.output_details = None
+        self.embedding_details = None
+
+    @property
+    def capacity(self) -> int:
+        """Number of inferences that can run at once (one per interpreter)."""
+        return 1
+
+    @property
+    def embedding_size(self) -> int:
+        """Length of the embedding vector, or 0 if the model exposes none."""
+        if self.embedding_details is None:
+            return 0
+        return math.prod(int(dim) for dim in self.embedding_details['shape'])
+
+    @property
+    def ready(self) -> bool:
+        return self.interpreter is not None
+
+    def preload(self):
+        """Read the model and labels into memory before forking workers.
+
+        Workers build their interpreters over this buffer, so its pages stay
+        shared copy-on-write instead of being loaded once per worker.
+        """
+        # Import the heavy modules here too so forked workers inherit them
+        import cv2  # noqa: F401
+        import numpy  # noqa: F401
+        import tflite_runtime.interpreter  # noqa: F401
+
+        self.model_content = settings.MODEL_PATH.read_bytes()
+        with open(settings.LABELS_PATH, 'r') as f:
+            self.labels = [line.strip() for line in f.readlines()]
 
     async def initialize(self):
         """Initialize the TFLite model and load labels."""
+        self.load()
+
+    def load(self):
+        """Create the interpreter and load labels; blocking, see initialize()."""
+        import tflite_runtime.interpreter as tflite
+
         try:
-            # Load model
+            # Load model, from the preloaded buffer when there is one.
+            # Intermediate tensors can only be read back when the interpreter
+            # keeps them, which disables buffer reuse; prefer models that
+            # export the embedding as an output.
+            if self.model_content is not None:
+                source = {"model_content": self.model_content}
+            else:
+                source = {"model_path": str(settings.MODEL_PATH.absolute())}
             self.interpreter = tflite.Interpreter(
-                model_path=str(settings.MODEL_PATH.absolute())
+                **source,
+                experimental_preserve_all_tensors=bool(settings.EMBEDDING_TENSOR),
             )
             self.interpreter.allocate_tensors()
 
             # Get input and output details
             self.input_details = self.interpreter.get_input_details()
             self.output_details = self.interpreter.get_output_details()
+            self.embedding_details = self._find_embedding()
 
             # Load labels
-            with open(settings.LABELS_PATH, 'r') as f:
-                self.labels = [line.strip() for line in f.readlines()]
+            if self.model_content is None:
+                with open(settings.LABELS_PATH, 'r') as f:
+                    self.labels = [line.strip() for line in f.readlines()]
+
+            interpreter_pool_size.set(self.capacity)
 
         except Exception as e:
             raise RuntimeError(f"Failed to initialize model: {e}")
 
+    def _find_embedding(self) -> Optional[Dict]:
+        """Locate the embedding tensor: by name if configured, else the second output."""
+        if settings.EMBEDDING_TENSOR:
+            for details in self.interpreter.get_tensor_details():
+                if details['name'] == settings.EMBEDDING_TENSOR:
+                    return details
+            raise ValueError(f"Embedding tensor not found: {settings.EMBEDDING_TENSOR}")
+        return self.output_details[1] if len(self.output_details) > 1 else None
+
     def preprocess_image(self, image_path: Path, bbox: Dict[str, float]) -> np.ndarray:
         """Preprocess image for model input."""
+        import cv2
+        import numpy as np
+
         try:
-            # Read and crop image
-            image = cv2.imread(str(image_path))
+            # Read and decode separately so each shows up in stage timings
+            with stage("read"):
+                data = np.fromfile(str(image_path), dtype=np.uint8)
+            with stage("decode"):
+                image = cv2.imdecode(data, cv2.IMREAD_COLOR) if data.size else None
             if image is None:
                 raise ValueError("Failed to read image")
 
-            height, width = image.shape[:2]
-            x1 = int(bbox['left'] * width)
-            y1 = int(bbox['top'] * height)
-            x2 = int(bbox['right'] * width)
-            y2 = int(bbox['bottom'] * height)
+            with stage("preprocess"):
+                return self._crop_and_normalize(image, bbox)
 
-            # Ensure coordinates are valid
-            x1 = max(0, min(x1, width - 1))
-            y1 = max(0, min(y1, height - 1))
-            x2 = max(0, min(x2, width))
-            y2 = max(0, min(y2, height))
+        except Exception as e:
+            raise ValueError(f"Failed to preprocess image: {e}")
 
-            # Crop and resize
-            cropped = image[y1:y2, x1:x2]
-            resized = cv2.resize(cropped, (settings.IMAGE_SIZE, settings.IMAGE_SIZE))
+    def _crop_and_normalize(self, image: np.ndarray, bbox: Dict[str, float]) -> np.ndarray:
+        """Crop to the bounding box, resize and scale to the model input range."""
+        import cv2
+        import numpy as np
 
-            # Convert to RGB
-            rgb = cv2.cvtColor(resized, cv2.COLOR_BGR2RGB)
+        height, width = image.shape[:2]
+        x1 = int(bbox['left'] * width)
+        y1 = int(bbox['top'] * height)
+        x2 = int(bbox['right'] * width)
+        y2 = int(bbox['bottom'] * height)
 
-            # Normalize to [-1, 1]
-            normalized = (rgb.astype(np.float32) - 127.5) / 127.5
+        # Ensure coordinates are valid
+        x1 = max(0, min(x1, width - 1))
+        y1 = max(0, min(y1, height - 1))
+        x2 = max(0, min(x2, width))
+        y2 = max(0, min(y2, height))
 
-            # Add batch dimension
-            return np.expand_dims(normalized, axis=0)
+        # Crop and resize
+        cropped = image[y1:y2, x1:x2]
+        resized = cv2.resize(cropped, (settings.IMAGE_SIZE, settings.IMAGE_SIZE))
 
-        except Exception as e:
-            raise ValueError(f"Failed to preprocess image: {e}")
+        # Convert to RGB
+        rgb = cv2.cvtColor(resized, cv2.COLOR_BGR2RGB)
+
+        # Normalize to [-1, 1]
+        normalized = (rgb.astype(np.float32) - 127.5) / 127.5
+
+        # Add batch dimension
+        return np.expand_dims(normalized, axis=0)
 
     def run_inference(self, preprocessed_image: np.ndarray) -> List[Dict[str, float]]:
         """Run model inference on preprocessed image."""
+        predictions, _ = self.classify(preprocessed_image)
+        return predictions
+
+    def classify(self, preprocessed_image: np.ndarray
+                 ) -> Tuple[List[Dict[str, float]], Optional[np.ndarray]]:
+        """Run inference and return the predictions and embedding (``None`` if absent)."""
         try:
             # Set input tensor
             self.interpreter.set_tensor(
@@ -80,30 +165,41 @@ class ModelManager:
             )
 
             # Run inference
-            self.interpreter.invoke()
+            with inference_in_progress.track(), stage("invoke"):
+                self.interpreter.invoke()
 
             # Get output tensor
             output_data = self.interpreter.get_tensor(
                 self.output_details[0]['index']
             )
 
-            # Process results
-            results = []
-            for i, score in enumerate(output_data[0]):
-                if score > settings.CONFIDENCE_THRESHOLD:
-                    results.append({
-                        'label': self.labels[i],
-                        'confidence': float(score)
-                    })
-
-            # Sort by confidence
-            results.sort(key=lambda x: x['confidence'], reverse=True)
-            
-            return results[:5]  # Return top 5 predictions
+            embedding = None
+            if self.embedding_details is not None:
+                embedding = self.interpreter.get_tensor(
+                    self.embedding_details['index']
+                ).reshape(-1)
+
+            with stage("postprocess"):
+                return self.postprocess(output_data), embedding
 
         except Exception as e:
             raise RuntimeError(f"Failed to run inference: {e}")
 
+    def postprocess(self, output_data: np.ndarray) -> List[Dict[str, float]]:
+        """Convert raw model scores into the top labelled predictions."""
+        results = []
+        for i, score in enumerate(output_data[0]):
+            if score > settings.CONFIDENCE_THRESHOLD:
+                results.append({
+                    'label': self.labels[i],
+                    'confidence': float(score)
+                })
+
+        # Sort by confidence
+        results.sort(key=lambda x: x['confidence'], reverse=True)
+
+        return results[:5]  # Return top 5 predictions
+
     async def process_image(self, image_path: Path, bbox: Dict[str, float]) -> List[Dict[str, float]]:
         """Process image and return predictions."""
         try:
@@ -121,4 +217,8 @@ class ModelManager:
     def __del__(self):
         """Cleanup when the model manager is destroyed."""
         if self.interpreter:
-            del self.interpreter 
\ No newline at end of file
+            del self.interpreter
+
+
+# Shared instance, initialized once at application startup
+model_manager = ModelManager()
@@ -0,0 +1,230 @@
+"""On-demand CPU sampling and memory allocation profiling for live workers.
+
+Nothing here runs until a profile is requested, so an idle worker pays no
+overhead. CPU profiles sample every thread's stack, including the event loop
+and inference threads, and are returned in the collapsed-stack format read by
+``flamegraph.pl``, speedscope and similar tools.
+"""
+import os
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, deque
+from pathlib import Path
+from typing import Deque, Dict, List, Optional
+
+# A single profile at a time; concurrent samplers would skew each other
+_profile_lock = threading.Lock()
+
+# Reference count of tracemalloc users (traced requests and memory windows) so
+# overlapping ones share one session and only the last one stops it
+_trace_lock = threading.Lock()
+_trace_users = 0
+_trace_started_here = False
+_request_profiles: Deque[Dict[str, object]] = deque(maxlen=50)
+
+
+class ProfilerBusyError(RuntimeError):
+    """Raised when a profile is requested while another is running."""
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    filename = os.path.join(*Path(code.co_filename).parts[-2:])
+    return f"{code.co_name} ({filename}:{frame.f_lineno})"
+
+
+def _thread_names() -> Dict[int, str]:
+    return {thread.ident: thread.name for thread in threading.enumerate()}
+
+
+def sample_stacks(duration: float, interval: float) -> Counter:
+    """Sample all thread stacks for ``duration`` seconds; blocks the caller.
+
+    Returns a counter keyed by collapsed stacks (root first, ``;`` separated,
+    prefixed with the thread name).
+    """
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfilerBusyError("A profile is already running")
+
+    try:
+        own_ident = threading.get_ident()
+        stacks: Counter = Counter()
+        names = _thread_names()
+        deadline = time.monotonic() + duration
+
+        while time.monotonic() < deadline:
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                frames = []
+                while frame is not None:
+                    frames.append(_frame_label(frame))
+                    frame = frame.f_back
+                if ident not in names:
+                    names = _thread_names()
+                frames.append(names.get(ident, f"thread-{ident}"))
+                stacks[";".join(reversed(frames))] += 1
+            time.sleep(interval)
+
+        return stacks
+    finally:
+        _profile_lock.release()
+
+
+def collapse(stacks: Counter) -> str:
+    """Render sampled stacks in collapsed-stack (folded) format."""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def _top_allocations(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot,
+                     limit: int) -> List[Dict[str, object]]:
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    stats = after.filter_traces(filters).compare_to(before.filter_traces(filters), "lineno")
+    return [
+        {
+            "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+            "size_diff_bytes": stat.size_diff,
+            "size_bytes": stat.size,
+            "count_diff": stat.count_diff,
+        }
+        for stat in stats[:limit]
+    ]
+
+
+def memory_window(duration: float, limit: int = 25, frames: int = 1) -> Dict[str, object]:
+    """Trace allocations for ``duration`` seconds and report the largest growth."""
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfilerBusyError("A profile is already running")
+
+    try:
+        _start_trace(frames)
+        try:
+            before = tracemalloc.take_snapshot()
+            time.sleep(duration)
+            after = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            _stop_trace()
+
+        return {
+            "duration_s": duration,
+            "traced_current_bytes": current,
+            "traced_peak_bytes": peak,
+            "top": _top_allocations(before, after, limit),
+        }
+    finally:
+        _profile_lock.release()
+
+
+def _start_trace(frames: int = 1) -> None:
+    global _trace_users, _trace_started_here
+    with _trace_lock:
+        if _trace_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            _trace_started_here = True
+        _trace_users += 1
+
+
+def _stop_trace() -> None:
+    global _trace_users, _trace_started_here
+    with _trace_lock:
+        _trace_users -= 1
+        if _trace_users == 0 and _trace_started_here:
+            tracemalloc.stop()
+            _trace_started_here = False
+
+
+def request_profiles() -> List[Dict[str, object]]:
+    """Return the most recent per-request allocation profiles, newest first."""
+    return list(reversed(_request_profiles))
+
+
+class MemoryProfileMiddleware:
+    """Capture a tracemalloc diff for requests sent with ``X-Profile-Memory``.
+
+    Only requests that also carry a valid admin token are traced; every other
+    request costs a single header scan. Tracing is process wide, so
+    allocations from requests running concurrently show up in the diff too.
+    """
+
+    def __init__(self, app, is_authorized, limit: int = 25):
+        self.app = app
+        self.is_authorized = is_authorized
+        self.limit = limit
+        self._next_id = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not any(
+                name == b"x-profile-memory" for name, _ in scope["headers"]):
+            await self.app(scope, receive, send)
+            return
+
+        token = next((value.decode("latin-1") for name, value in scope["headers"]
+                      if name == b"x-admin-token"), None)
+        if not self.is_authorized(token):
+            await self.app(scope, receive, send)
+            return
+
+        self._next_id += 1
+        profile_id = self._next_id
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-memory-profile-id", str(profile_id).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        _start_trace()
+        try:
+            before = tracemalloc.take_snapshot()
+            start = time.perf_counter()
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                elapsed = time.perf_counter() - start
+                # A memory window ending mid-request may have stopped tracing
+                top = []
+                if tracemalloc.is_tracing():
+                    top = _top_allocations(before, tracemalloc.take_snapshot(), self.limit)
+                _request_profiles.append({
+                    "id": profile_id,
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "timestamp": time.time(),
+                    "duration_ms": elapsed * 1000.0,
+                    "top": top,
+                })
+        finally:
+            _stop_trace()
+
+
+def install_signal_handler(output_dir: Path, duration: float, interval: float,
+                           signum: Optional[int] = None) -> bool:
+    """Write a CPU profile to ``output_dir`` whenever the worker gets ``signum``.
+
+    Useful when the event loop is stuck and the HTTP endpoint cannot respond.
+    Returns ``False`` on platforms without ``SIGUSR2`` or when not called from
+    the main thread, where Python does not allow installing handlers.
+    """
+    signum = signum or getattr(signal, "SIGUSR2", None)
+    if signum is None or threading.current_thread() is not threading.main_thread():
+        return False
+
+    def run_profile():
+        try:
+            stacks = sample_stacks(duration, interval)
+        except ProfilerBusyError:
+            return
+        output_dir.mkdir(parents=True, exist_ok=True)
+        path = output_dir / f"cpu-{os.getpid()}-{int(time.time())}.folded"
+        path.write_text(collapse(stacks))
+
+    def handler(signum, frame):
+        threading.Thread(target=run_profile, name="signal-profiler", daemon=True).start()
+
+    signal.signal(signum, handler)
+    return True
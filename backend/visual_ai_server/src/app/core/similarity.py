@@ -0,0 +1,279 @@
+"""Vector storage and similarity search over stored predictions.
+
+Two kinds of vectors are kept per prediction:
+
+- the model embedding (penultimate layer), which powers "find similar"
+  lookups, and
+- a crop fingerprint, a small colour thumbnail of the model input. It is
+  computed before inference, so a near-duplicate upload can reuse an earlier
+  result instead of running the model again.
+
+Each store is one append-only file of fixed-size records (an int64 prediction
+id followed by an L2-normalized float16 vector) that is memory-mapped for
+reading. Appends never rewrite earlier records, so readers in other worker
+processes only have to remap the grown file. Search is an exact brute-force
+scan. Decoding float16 costs more than the dot products, so each process keeps
+a float32 copy of the first rows, up to ``cache_bytes`` per store, and scans
+the rest of the mapping in fixed-size blocks decoded into one reused buffer.
+The mapped file itself sits in the page cache, shared by every worker. A scan
+of 10^5 small vectors takes a few milliseconds, well before an approximate
+(IVF) index is worth its training step and recall loss.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from .config import settings
+
+# NumPy and OpenCV are imported where used, as in model_manager
+if TYPE_CHECKING:
+    import numpy as np
+
+FINGERPRINT_SIZE = 8
+# Two components (cos, sin) per channel of every thumbnail cell
+FINGERPRINT_DIM = FINGERPRINT_SIZE ** 2 * 3 * 2
+
+
+def normalize(vector: np.ndarray) -> np.ndarray:
+    """Return ``vector`` as float32 with unit L2 norm (zero vectors stay zero)."""
+    import numpy as np
+
+    vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+def fingerprint(preprocessed: np.ndarray, size: int = FINGERPRINT_SIZE) -> np.ndarray:
+    """Fingerprint a preprocessed model input, scaled to [-1, 1], as a colour thumbnail.
+
+    Every channel value of the thumbnail is mapped to an angle in [0, pi/2]
+    and stored as its cosine and sine. All fingerprints then have the same
+    norm, and the cosine similarity of two is the mean cosine of their angle
+    differences: it depends on absolute colour and brightness, not only on
+    the pattern. A uniform shift by ``d`` in input units scores ``cos(pi*d/4)``,
+    e.g. 0.9981 for 10/255 of full scale.
+    """
+    import cv2
+    import numpy as np
+
+    image = preprocessed.reshape(preprocessed.shape[-3:]).astype(np.float32)
+    thumbnail = cv2.resize(image, (size, size), interpolation=cv2.INTER_AREA)
+    angles = (np.clip(thumbnail, -1.0, 1.0) + 1.0) * (np.pi / 4)
+    return normalize(np.concatenate([np.cos(angles).ravel(), np.sin(angles).ravel()]))
+
+
+class EmbeddingStore:
+    """Append-only, memory-mapped float16 vectors keyed by prediction id."""
+
+    # Rows decoded to float32 at a time during a scan
+    BLOCK_ROWS = 4096
+
+    def __init__(self, path: Path, dim: int, cache_bytes: int = 0):
+        import numpy as np
+
+        self.path = Path(path)
+        self.dim = dim
+        self.dtype = np.dtype([("id", "<i8"), ("vector", "<f2", (dim,))])
+        self._lock = threading.Lock()
+        self._records = np.empty(0, dtype=self.dtype)
+        self._rows: Dict[int, int] = {}
+        # Decoded float32 copy of the first rows, grown up to cache_bytes
+        self.cache_rows = cache_bytes // (4 * dim)
+        self._cached = 0
+        self._cache = np.empty((0, dim), dtype=np.float32)
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.touch(exist_ok=True)
+        # Drop a partial record left by a crash mid-append
+        size = self.path.stat().st_size
+        if size % self.dtype.itemsize:
+            os.truncate(self.path, size - size % self.dtype.itemsize)
+
+    def __len__(self) -> int:
+        return len(self._mapped()[0])
+
+    def _mapped(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the records appended so far, by this or any process.
+
+        The file is remapped when it has grown; only new rows are indexed and
+        decoded into the float32 cache. Also returns the cached vectors.
+        """
+        import numpy as np
+
+        count = self.path.stat().st_size // self.dtype.itemsize
+        with self._lock:
+            if count > len(self._records):
+                records = np.memmap(self.path, dtype=self.dtype, mode="r",
+                                    shape=(count,))
+                new_ids = records["id"][len(self._records):].tolist()
+                for row, key in enumerate(new_ids, start=len(self._records)):
+                    self._rows[key] = row
+                self._records = records
+
+                cached = min(count, self.cache_rows)
+                if cached > self._cached:
+                    if cached > len(self._cache):
+                        # Grow geometrically so appends stay amortized O(1)
+                        capacity = min(self.cache_rows, max(cached, 2 * len(self._cache)))
+                        self._cache = np.resize(self._cache, (capacity, self.dim))
+                    self._cache[self._cached:cached] = records["vector"][self._cached:cached]
+                    self._cached = cached
+            return self._records, self._cache[:self._cached]
+
+    def append(self, key: int, vector: np.ndarray) -> None:
+        import numpy as np
+
+        record = np.zeros(1, dtype=self.dtype)
+        record["id"] = key
+        record["vector"] = normalize(vector)
+        # A single write of a whole record, so concurrent appenders never interleave
+        with self._lock, open(self.path, "ab", buffering=0) as f:
+            f.write(record.tobytes())
+
+    def get(self, key: int) -> Optional[np.ndarray]:
+        import numpy as np
+
+        records, _ = self._mapped()
+        row = self._rows.get(key)
+        if row is None:
+            return None
+        return records["vector"][row].astype(np.float32)
+
+    def search(self, query: np.ndarray, k: int = 10,
+               exclude: Optional[int] = None) -> List[Tuple[int, float]]:
+        """Return up to ``k`` ``(id, cosine similarity)`` pairs, most similar first."""
+        import numpy as np
+
+        records, cache = self._mapped()
+        if len(records) == 0 or k <= 0:
+            return []
+
+        query = normalize(query)
+        scores = np.empty(len(records), dtype=np.float32)
+        np.matmul(cache, query, out=scores[:len(cache)])
+        if len(records) > len(cache):
+            vectors = records["vector"]
+            block = np.empty((min(self.BLOCK_ROWS, len(records) - len(cache)), self.dim),
+                             dtype=np.float32)
+            for start in range(len(cache), len(records), self.BLOCK_ROWS):
+                stop = min(start + self.BLOCK_ROWS, len(records))
+                np.copyto(block[:stop - start], vectors[start:stop])
+                np.matmul(block[:stop - start], query, out=scores[start:stop])
+
+        ids = records["id"]
+        if exclude is not None:
+            scores[ids == exclude] = -np.inf
+
+        k = min(k, len(records))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(ids[i]), float(scores[i])) for i in top if np.isfinite(scores[i])]
+
+
+class ResultCache:
+    """LRU cache of full prediction results by prediction id, with a TTL."""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, Tuple[float, List[Dict[str, float]]]]" = OrderedDict()
+
+    def get(self, key: int) -> Optional[List[Dict[str, float]]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: int, predictions: List[Dict[str, float]]) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, predictions)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SimilarityIndex:
+    """Embedding and fingerprint stores for the predictions in the database."""
+
+    def __init__(self, cache_size: int = 1000, cache_ttl: float = 3600,
+                 vector_cache_bytes: int = 0):
+        self.vector_cache_bytes = vector_cache_bytes
+        self.embeddings: Optional[EmbeddingStore] = None
+        self.fingerprints: Optional[EmbeddingStore] = None
+        self.results = ResultCache(cache_size, cache_ttl)
+
+    @property
+    def enabled(self) -> bool:
+        return self.fingerprints is not None
+
+    def open(self, directory: Path, embedding_size: int) -> None:
+        """Open the stores under ``directory``. Skip embeddings when the size is 0."""
+        directory = Path(directory)
+        # The vector size is part of the file name, so a model with a different
+        # embedding size starts a new store instead of misreading the old one.
+        self.embeddings = None
+        if embedding_size:
+            self.embeddings = EmbeddingStore(
+                directory / f"embeddings-{embedding_size}.f16", embedding_size,
+                self.vector_cache_bytes)
+        self.fingerprints = EmbeddingStore(
+            directory / f"fingerprints-{FINGERPRINT_DIM}.f16", FINGERPRINT_DIM,
+            self.vector_cache_bytes)
+        self.results.clear()
+
+    def close(self) -> None:
+        self.embeddings = None
+        self.fingerprints = None
+        self.results.clear()
+
+    def find_duplicate(self, signature: np.ndarray,
+                       threshold: float) -> Optional[Tuple[int, float]]:
+        """Return the most similar stored crop if it reaches ``threshold``."""
+        matches = self.fingerprints.search(signature, k=1)
+        if matches and matches[0][1] >= threshold:
+            return matches[0]
+        return None
+
+    def embedding(self, prediction_id: int) -> Optional[np.ndarray]:
+        if self.embeddings is None:
+            return None
+        return self.embeddings.get(prediction_id)
+
+    def add(self, prediction_id: int, signature: np.ndarray,
+            embedding: Optional[np.ndarray],
+            predictions: List[Dict[str, float]]) -> None:
+        """Record a new prediction's vectors and cache its full results."""
+        self.fingerprints.append(prediction_id, signature)
+        if self.embeddings is not None and embedding is not None:
+            self.embeddings.append(prediction_id, embedding)
+        self.results.put(prediction_id, predictions)
+
+    def similar(self, prediction_id: int, k: int = 10) -> List[Tuple[int, float]]:
+        """Return the predictions whose embeddings are closest to ``prediction_id``'s.
+
+        Raises ``KeyError`` if no embedding is stored for the prediction.
+        """
+        query = self.embedding(prediction_id)
+        if query is None:
+            raise KeyError(prediction_id)
+        return self.embeddings.search(query, k, exclude=prediction_id)
+
+
+# Shared instance, opened at application startup once the model is loaded
+similarity_index = SimilarityIndex(settings.MAX_CACHE_SIZE, settings.CACHE_TTL,
+                                   settings.VECTOR_CACHE_SIZE)
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from ..core.config import settings
@@ -23,6 +23,27 @@ def get_db():
     finally:
         db.close()
 
-def init_db():
+def init_db(bind=None):
     """Initialize database with tables."""
-    Base.metadata.create_all(bind=engine) 
\ No newline at end of file
+    bind = bind or engine
+    Base.metadata.create_all(bind=bind)
+    add_missing_columns(bind)
+
+def add_missing_columns(bind):
+    """Add columns and indexes introduced after a table was first created.
+
+    create_all() only creates missing tables, so existing databases would not
+    get new columns. New columns must therefore be nullable.
+    """
+    inspector = inspect(bind)
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=bind.dialect)
+                    conn.execute(text(
+                        f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"
+                    ))
+            for index in table.indexes:
+                index.create(conn, checkfirst=True) 
\ No newline at end of file
@@ -1,8 +1,7 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, JSON
 from sqlalchemy.sql import func
-from sqlalchemy.ext.declarative import declarative_base
 
-Base = declarative_base()
+from ..db.database import Base
 
 class Prediction(Base):
     __tablename__ = "predictions"
@@ -17,6 +16,11 @@ class Prediction(Base):
     bbox_bottom = Column(Float, nullable=False)
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
     is_synced = Column(Boolean, default=False)
+    # Every label and confidence the model returned, so near-duplicates can reuse them
+    results = Column(JSON)
+    # Set for records uploaded through the sync API
+    idempotency_key = Column(String(64), unique=True, index=True)
+    device_id = Column(String(64), index=True)
 
     class Config:
         orm_mode = True 
\ No newline at end of file
@@ -0,0 +1,70 @@
+import hmac
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
+
+from ..core import profiler
+from ..core.config import settings
+
+router = APIRouter()
+
+def is_admin_token(token: Optional[str]) -> bool:
+    """Check a token against the configured admin token."""
+    if not settings.ADMIN_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token.encode(), settings.ADMIN_TOKEN.encode())
+
+async def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Dependency rejecting requests without a valid admin token."""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not found")
+    if not is_admin_token(x_admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+@router.post("/profile/cpu", response_class=PlainTextResponse,
+             dependencies=[Depends(require_admin)])
+async def profile_cpu(
+    seconds: float = Query(10.0, gt=0),
+    interval_ms: float = Query(5.0, ge=1, le=1000),
+):
+    """Sample all worker threads and return collapsed stacks for flame graphs."""
+    if seconds > settings.PROFILE_MAX_SECONDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Profile duration is limited to {settings.PROFILE_MAX_SECONDS}s"
+        )
+
+    try:
+        # Sample from a worker thread so the event loop keeps serving requests
+        stacks = await run_in_threadpool(
+            profiler.sample_stacks, seconds, interval_ms / 1000.0
+        )
+    except profiler.ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    return profiler.collapse(stacks)
+
+@router.post("/profile/memory", dependencies=[Depends(require_admin)])
+async def profile_memory(
+    seconds: float = Query(10.0, gt=0),
+    limit: int = Query(25, ge=1, le=500),
+    frames: int = Query(1, ge=1, le=50),
+):
+    """Trace allocations for a time window and return the largest growth."""
+    if seconds > settings.PROFILE_MAX_SECONDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Profile duration is limited to {settings.PROFILE_MAX_SECONDS}s"
+        )
+
+    try:
+        return await run_in_threadpool(profiler.memory_window, seconds, limit, frames)
+    except profiler.ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@router.get("/profile/requests", dependencies=[Depends(require_admin)])
+async def get_request_profiles():
+    """List allocation profiles of requests sent with ``X-Profile-Memory``."""
+    return profiler.request_profiles()
@@ -1,31 +1,85 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 from pathlib import Path
 
-from ..core.model_manager import ModelManager
+from ..core.config import settings
+from ..core.metrics import cache_requests, stage
+from ..core.model_manager import model_manager
+from ..core.similarity import fingerprint, similarity_index
 from ..db.database import get_db
 from ..models.prediction import Prediction
-from ..schemas.prediction import PredictionCreate, PredictionResponse
+from ..schemas.prediction import (
+    PREDICTION_FIELDS,
+    PredictionCreate,
+    PredictionCreateResponse,
+    PredictionFields,
+    SimilarPrediction,
+)
+
+if TYPE_CHECKING:
+    import numpy as np
 
 router = APIRouter()
-model_manager = ModelManager()
 
-@router.post("/", response_model=List[PredictionResponse])
+FIELDS_DESCRIPTION = (
+    "Comma separated subset of fields to return, e.g. `id,label,confidence`"
+)
+
+def select_columns(fields: Optional[str]) -> list:
+    """Resolve the `fields` query parameter to the columns to load."""
+    if not fields:
+        names = PREDICTION_FIELDS
+    else:
+        names = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+        if not names:
+            raise HTTPException(
+                status_code=400,
+                detail=f"No fields given. Allowed fields: {list(PREDICTION_FIELDS)}"
+            )
+        unknown = [name for name in names if name not in PREDICTION_FIELDS]
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown fields: {unknown}. Allowed fields: {list(PREDICTION_FIELDS)}"
+            )
+    return [getattr(Prediction, name) for name in names]
+
+def find_duplicate(db: Session, signature: "np.ndarray"
+                   ) -> Optional[Tuple[int, List[Dict[str, float]]]]:
+    """Find a stored near-duplicate crop and return its id and results."""
+    with stage("dedupe"):
+        match = similarity_index.find_duplicate(signature, settings.NEAR_DUPLICATE_THRESHOLD)
+        predictions = None
+        if match is not None:
+            predictions = similarity_index.results.get(match[0])
+            if predictions is None:
+                # Evicted or stored by another worker. Rows without stored
+                # results (synced or older) are not reused.
+                predictions = db.query(Prediction.results).filter(
+                    Prediction.id == match[0]).scalar()
+
+    cache_requests.inc(result="hit" if predictions else "miss")
+    return (match[0], predictions) if predictions else None
+
+@router.post("/", response_model=PredictionCreateResponse)
 async def create_prediction(
     prediction: PredictionCreate,
     db: Session = Depends(get_db),
 ):
     """Create a new prediction."""
+    if not model_manager.ready:
+        raise HTTPException(status_code=503, detail="Model is not loaded yet")
+
     try:
         # Verify image exists
         image_path = Path(prediction.image_path)
         if not image_path.exists():
             raise HTTPException(status_code=404, detail="Image not found")
 
-        # Process image and get predictions
-        predictions = await model_manager.process_image(
-            image_path=image_path,
+        preprocessed = model_manager.preprocess_image(
+            image_path,
             bbox={
                 'left': prediction.bbox_left,
                 'top': prediction.bbox_top,
@@ -34,6 +88,19 @@ async def create_prediction(
             }
         )
 
+        # Reuse the result of a near-identical crop instead of running the model
+        signature = fingerprint(preprocessed) if similarity_index.enabled else None
+        duplicate = None
+        if signature is not None and settings.NEAR_DUPLICATE_THRESHOLD > 0:
+            duplicate = find_duplicate(db, signature)
+
+        if duplicate is not None:
+            duplicate_of, predictions = duplicate
+            embedding = similarity_index.embedding(duplicate_of)
+        else:
+            duplicate_of = None
+            predictions, embedding = model_manager.classify(preprocessed)
+
         if not predictions:
             raise HTTPException(
                 status_code=400,
@@ -49,34 +116,84 @@ async def create_prediction(
             bbox_top=prediction.bbox_top,
             bbox_right=prediction.bbox_right,
             bbox_bottom=prediction.bbox_bottom,
-            is_synced=True
+            is_synced=True,
+            results=predictions,
         )
-        db.add(db_prediction)
-        db.commit()
-        db.refresh(db_prediction)
+        with stage("db_commit"):
+            db.add(db_prediction)
+            db.commit()
+            db.refresh(db_prediction)
+
+        if signature is not None:
+            with stage("index"):
+                similarity_index.add(db_prediction.id, signature, embedding, predictions)
 
-        return predictions
+        return {
+            "id": db_prediction.id,
+            "label": db_prediction.label,
+            "confidence": db_prediction.confidence,
+            "timestamp": db_prediction.timestamp,
+            "predictions": predictions,
+            "duplicate_of": duplicate_of,
+        }
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/", response_model=List[PredictionResponse])
-async def get_predictions(
+@router.get("/", response_model=List[PredictionFields])
+def get_predictions(
     skip: int = 0,
     limit: int = 100,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     db: Session = Depends(get_db),
 ):
     """Get all predictions."""
-    predictions = db.query(Prediction).offset(skip).limit(limit).all()
-    return predictions
+    # Load plain rows instead of ORM objects and skip response model validation;
+    # the columns already have the response types.
+    columns = select_columns(fields)
+    rows = db.query(*columns).order_by(Prediction.id).offset(skip).limit(limit).all()
+    return ORJSONResponse([row._asdict() for row in rows])
 
-@router.get("/{prediction_id}", response_model=PredictionResponse)
-async def get_prediction(
+@router.get("/{prediction_id}", response_model=PredictionFields)
+def get_prediction(
     prediction_id: int,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     db: Session = Depends(get_db),
 ):
     """Get a specific prediction."""
-    prediction = db.query(Prediction).filter(Prediction.id == prediction_id).first()
-    if prediction is None:
+    columns = select_columns(fields)
+    row = db.query(*columns).filter(Prediction.id == prediction_id).first()
+    if row is None:
         raise HTTPException(status_code=404, detail="Prediction not found")
-    return prediction 
\ No newline at end of file
+    return ORJSONResponse(row._asdict())
+
+@router.get("/{prediction_id}/similar", response_model=List[SimilarPrediction])
+def get_similar_predictions(
+    prediction_id: int,
+    k: int = Query(10, ge=1, le=100, description="Number of results"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: Session = Depends(get_db),
+):
+    """Get the predictions whose image embeddings are closest to this one."""
+    if similarity_index.embeddings is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Similarity search is unavailable: the model exposes no embedding"
+        )
+    try:
+        # Ask for a few extra in case some ids no longer exist in the database
+        matches = similarity_index.similar(prediction_id, k + 10)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="No embedding stored for this prediction")
+
+    columns = select_columns(fields)
+    if not any(column.key == "id" for column in columns):
+        columns = [Prediction.id] + columns
+    scores = dict(matches)
+    rows = db.query(*columns).filter(Prediction.id.in_(list(scores))).all()
+
+    results = [{**row._asdict(), "similarity": scores[row.id]} for row in rows]
+    results.sort(key=lambda result: result["similarity"], reverse=True)
+    return ORJSONResponse(results[:k])
@@ -0,0 +1,180 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import ORJSONResponse
+from pydantic import ValidationError
+from sqlalchemy import func, insert, or_
+from sqlalchemy.orm import Session
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+import orjson
+
+from ..core.compression import BodyTooLargeError, UnsupportedEncodingError, decompress_body
+from ..core.config import settings
+from ..core.metrics import stage, sync_records
+from ..db.database import get_db
+from ..models.prediction import Prediction
+from ..schemas.prediction import PREDICTION_FIELDS
+from ..schemas.sync import MAX_CURSOR, SyncChanges, SyncRecord, SyncRequest, SyncResponse
+
+router = APIRouter()
+
+# Keys per IN (...) lookup, well below SQLite's bound parameter limit
+KEY_CHUNK = 500
+
+async def read_body(request: Request, max_size: int) -> bytes:
+    """Read the raw request body, failing with 413 once it passes ``max_size``.
+
+    Content-Length is checked up front, but chunked uploads have none, so the
+    limit is also enforced while the body streams in.
+    """
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > max_size:
+        raise HTTPException(status_code=413, detail="Sync batch is too large")
+
+    chunks = []
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > max_size:
+            raise HTTPException(status_code=413, detail="Sync batch is too large")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+async def read_sync_request(request: Request) -> SyncRequest:
+    """Parse a sync batch, gzip or deflate compressed or plain JSON."""
+    body = await read_body(request, settings.SYNC_MAX_BODY_SIZE)
+    try:
+        body = decompress_body(body, request.headers.get("content-encoding"),
+                               settings.SYNC_MAX_BODY_SIZE)
+        payload = SyncRequest.model_validate(orjson.loads(body))
+    except UnsupportedEncodingError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except BodyTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValidationError as e:
+        raise RequestValidationError(e.errors(include_url=False))
+    except ValueError as e:
+        # Corrupt compressed data or invalid JSON
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if len(payload.records) > settings.SYNC_MAX_RECORDS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.SYNC_MAX_RECORDS} records per batch"
+        )
+    return payload
+
+def _ids_for_keys(db: Session, keys: List[str]) -> Dict[str, int]:
+    ids = {}
+    for start in range(0, len(keys), KEY_CHUNK):
+        ids.update(db.query(Prediction.idempotency_key, Prediction.id).filter(
+            Prediction.idempotency_key.in_(keys[start:start + KEY_CHUNK])).all())
+    return ids
+
+def _insert_statement(db: Session):
+    """INSERT that skips rows whose idempotency key is already stored."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        return insert(Prediction)
+    return dialect_insert(Prediction).on_conflict_do_nothing(
+        index_elements=[Prediction.idempotency_key])
+
+def _utc(timestamp: Optional[datetime]) -> datetime:
+    if timestamp is None:
+        return datetime.now(timezone.utc).replace(tzinfo=None)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+def store_records(db: Session, device_id: str,
+                  records: List[SyncRecord]) -> Tuple[Dict[str, int], int]:
+    """Bulk-insert records not stored yet.
+
+    Returns the server id for every key in the batch and the number of
+    records inserted.
+    """
+    # The first record wins when a batch repeats a key
+    unique: Dict[str, SyncRecord] = {}
+    for record in records:
+        unique.setdefault(record.idempotency_key, record)
+    keys = list(unique)
+
+    existing = _ids_for_keys(db, keys)
+    rows = [
+        {
+            **record.model_dump(exclude={"timestamp"}),
+            "timestamp": _utc(record.timestamp),
+            "device_id": device_id,
+            "is_synced": True,
+        }
+        for key, record in unique.items() if key not in existing
+    ]
+    if rows:
+        with stage("db_commit"):
+            # A single executemany; keys racing in from a concurrent upload
+            # are skipped by the unique index
+            db.execute(_insert_statement(db), rows)
+            db.commit()
+
+    ids = _ids_for_keys(db, keys) if rows else existing
+    accepted = len(ids) - len(existing)
+    sync_records.inc(accepted, result="accepted")
+    sync_records.inc(len(records) - accepted, result="duplicate")
+    return ids, accepted
+
+def changes_since(db: Session, cursor: int, device_id: Optional[str],
+                  limit: int) -> Dict[str, object]:
+    """Rows after ``cursor`` that ``device_id`` did not upload, and the next cursor.
+
+    The cursor is the highest prediction id the client has seen. Rows are
+    never updated, and SQLite commits writes in id order, so every row after
+    the cursor is new to the client. Rows the device uploaded itself are
+    skipped, but the cursor still moves past them.
+    """
+    # Read the head first so rows committed in between wait for the next call
+    head = db.query(func.max(Prediction.id)).scalar() or 0
+    columns = [getattr(Prediction, name) for name in PREDICTION_FIELDS]
+    query = db.query(*columns).filter(Prediction.id > cursor, Prediction.id <= head)
+    if device_id:
+        query = query.filter(or_(Prediction.device_id.is_(None),
+                                 Prediction.device_id != device_id))
+    rows = query.order_by(Prediction.id).limit(limit + 1).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "changes": [row._asdict() for row in rows],
+        "cursor": rows[-1].id if has_more else head,
+        "has_more": has_more,
+    }
+
+@router.post("/", response_model=SyncResponse)
+def sync(
+    payload: SyncRequest = Depends(read_sync_request),
+    db: Session = Depends(get_db),
+):
+    """Upload predictions made offline and pull the ones this device lacks."""
+    ids, accepted = store_records(db, payload.device_id, payload.records)
+    result = changes_since(db, payload.cursor, payload.device_id, settings.SYNC_PAGE_SIZE)
+    return ORJSONResponse({
+        "accepted": accepted,
+        "duplicates": len(payload.records) - accepted,
+        "ids": ids,
+        **result,
+    })
+
+@router.get("/changes", response_model=SyncChanges)
+def get_changes(
+    cursor: int = Query(0, ge=0, le=MAX_CURSOR,
+                        description="Cursor from the previous sync response"),
+    device_id: Optional[str] = Query(None, description="Skip rows uploaded by this device"),
+    limit: Optional[int] = Query(None, ge=1, description="Maximum rows to return"),
+    db: Session = Depends(get_db),
+):
+    """Pull predictions created after `cursor`."""
+    limit = min(limit or settings.SYNC_PAGE_SIZE, settings.SYNC_PAGE_SIZE)
+    return ORJSONResponse(changes_since(db, cursor, device_id, limit))
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 class PredictionBase(BaseModel):
     image_path: str
@@ -20,4 +20,36 @@ class PredictionResponse(PredictionBase):
     is_synced: bool
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True
+
+class PredictionResult(BaseModel):
+    label: str
+    confidence: float
+
+class PredictionCreateResponse(BaseModel):
+    id: int
+    label: str
+    confidence: float
+    timestamp: datetime
+    predictions: List[PredictionResult]
+    duplicate_of: Optional[int] = None  # Set when a near-duplicate's result was reused
+
+class PredictionFields(BaseModel):
+    """A stored prediction limited to the requested `fields`; the others are omitted."""
+    id: Optional[int] = None
+    image_path: Optional[str] = None
+    bbox_left: Optional[float] = None
+    bbox_top: Optional[float] = None
+    bbox_right: Optional[float] = None
+    bbox_bottom: Optional[float] = None
+    label: Optional[str] = None
+    confidence: Optional[float] = None
+    timestamp: Optional[datetime] = None
+    is_synced: Optional[bool] = None
+
+class SimilarPrediction(PredictionFields):
+    id: int  # Always returned
+    similarity: float
+
+# Columns selectable through the `fields` query parameter
+PREDICTION_FIELDS = tuple(PredictionResponse.model_fields)
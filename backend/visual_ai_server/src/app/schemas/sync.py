@@ -0,0 +1,30 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from .prediction import PredictionBase, PredictionResponse
+
+# Largest id a 64-bit SQL INTEGER can hold; larger cursors fail validation
+MAX_CURSOR = 2 ** 63 - 1
+
+class SyncRecord(PredictionBase):
+    """A prediction computed on the device."""
+    idempotency_key: str = Field(..., min_length=1, max_length=64)
+    label: str
+    confidence: float = Field(..., ge=0, le=1)
+    timestamp: Optional[datetime] = None
+
+class SyncRequest(BaseModel):
+    device_id: str = Field(..., min_length=1, max_length=64)
+    cursor: int = Field(0, ge=0, le=MAX_CURSOR)  # From the previous sync response
+    records: List[SyncRecord] = []
+
+class SyncChanges(BaseModel):
+    changes: List[PredictionResponse]
+    cursor: int
+    has_more: bool
+
+class SyncResponse(SyncChanges):
+    accepted: int
+    duplicates: int
+    ids: Dict[str, int]  # Server id for every uploaded idempotency key
@@ -1,17 +1,43 @@
-from fastapi import FastAPI, HTTPException
+import asyncio
+import os
+import sys
+
+from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 import uvicorn
 
-from app.routers import predictions, images
+from app.routers import predictions, images, admin, sync
 from app.core.config import settings
-from app.core.model_manager import ModelManager
+from app.core import admission, compression, metrics, profiler
+from app.core.model_manager import model_manager
+from app.core.similarity import similarity_index
+from app.db.database import init_db
 
 app = FastAPI(
     title="Visual AI API",
     description="API for image recognition using MobileNetV3-Small",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
+)
+
+# Shed inference load early; added first so CORS headers wrap rejections
+inference_limiter = admission.ConcurrencyLimiter(
+    limit=settings.ADMISSION_MAX_CONCURRENT or model_manager.capacity,
+    queue_size=settings.ADMISSION_QUEUE_SIZE,
+    queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT,
+)
+rate_limit_store = admission.create_rate_limit_store(settings.RATE_LIMIT_STORE)
+app.add_middleware(
+    admission.AdmissionMiddleware,
+    limiter=inference_limiter,
+    store=rate_limit_store,
+    rate=settings.RATE_LIMIT_PER_SECOND,
+    burst=settings.RATE_LIMIT_BURST,
+    trust_forwarded_for=settings.TRUST_FORWARDED_FOR,
+    trusted_proxies=settings.TRUSTED_PROXIES,
 )
 
 # Configure CORS
@@ -23,32 +49,99 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Mount static files for image uploads
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+# Compress large JSON/text responses (Brotli when installed, else gzip)
+app.add_middleware(
+    compression.CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MIN_SIZE,
+    gzip_level=settings.GZIP_LEVEL,
+    brotli_quality=settings.BROTLI_QUALITY,
+)
+
+# Record request metrics and the Server-Timing header
+app.add_middleware(metrics.MetricsMiddleware)
+
+# Per-request allocation profiles for admin requests with X-Profile-Memory
+app.add_middleware(profiler.MemoryProfileMiddleware, is_authorized=admin.is_admin_token)
+
+# Mount static files for image uploads; the directory is created in prepare()
+app.mount("/uploads", StaticFiles(directory=str(settings.UPLOAD_DIR), check_dir=False),
+          name="uploads")
 
 # Include routers
 app.include_router(predictions.router, prefix="/api/predictions", tags=["predictions"])
 app.include_router(images.router, prefix="/api/images", tags=["images"])
+app.include_router(admin.router, prefix="/api/admin", tags=["admin"])
+app.include_router(sync.router, prefix="/api/sync", tags=["sync"])
 
-# Initialize model on startup
-@app.on_event("startup")
-async def startup_event():
+_prepared = False
+
+def prepare():
+    """Create directories and database tables. Runs once per server.
+
+    The prefork server calls this in the master before forking, so workers
+    do not race each other creating tables.
+    """
+    global _prepared
+    if not _prepared:
+        settings.UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+        init_db()
+        _prepared = True
+
+async def load_model():
+    """Load the model off the event loop, then open the similarity index."""
     try:
-        model_manager = ModelManager()
-        await model_manager.initialize()
+        await run_in_threadpool(model_manager.load)
+        similarity_index.open(settings.EMBEDDINGS_DIR, model_manager.embedding_size)
+        app.state.model_status = "ready"
     except Exception as e:
         print(f"Error initializing model: {e}")
-        raise HTTPException(status_code=500, detail="Failed to initialize model")
+        app.state.model_status = "failed"
+
+app.state.model_status = "loading"
+
+@app.on_event("startup")
+async def startup_event():
+    prepare()
+
+    # With several workers, share metric values so any of them can answer /metrics
+    if settings.METRICS_DIR is not None:
+        metrics.registry.enable_multiprocess(settings.METRICS_DIR)
+
+    # Serve /api/health while the model loads; predictions return 503 until
+    # it is ready. Await app.state.model_loader to wait for it.
+    app.state.model_loader = asyncio.create_task(load_model())
+
+    # `kill -USR2 <pid>` writes a CPU profile even if the event loop is stuck
+    profiler.install_signal_handler(
+        settings.PROFILE_DIR,
+        duration=settings.PROFILE_SIGNAL_SECONDS,
+        interval=0.005,
+    )
 
 @app.get("/api/health")
 async def health_check():
-    return JSONResponse({"status": "healthy"})
+    status = app.state.model_status
+    if status == "failed":
+        return JSONResponse({"status": "unhealthy", "model": status}, status_code=503)
+    return JSONResponse({"status": "healthy", "model": status})
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    return Response(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
 
 if __name__ == "__main__":
-    uvicorn.run(
-        "main:app",
-        host=settings.HOST,
-        port=settings.PORT,
-        reload=settings.DEBUG,
-        workers=settings.WORKERS,
-    ) 
\ No newline at end of file
+    if settings.WORKERS > 1:
+        # Preload once and fork workers that share the model, see server.py.
+        # Replace this process: importing the app from here would build it a
+        # second time, since this module runs as __main__ rather than main.
+        server = os.path.join(os.path.dirname(os.path.abspath(__file__)), "server.py")
+        os.execv(sys.executable, [sys.executable, server, "--host", settings.HOST,
+                                  "--port", str(settings.PORT),
+                                  "--workers", str(settings.WORKERS)])
+    else:
+        uvicorn.run(
+            "main:app",
+            host=settings.HOST,
+            port=settings.PORT,
+            reload=settings.DEBUG,
+        ) 
\ No newline at end of file
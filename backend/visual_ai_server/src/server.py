@@ -0,0 +1,159 @@
+"""Preload-then-fork server with workers sharing the model copy-on-write.
+
+Usage (from ``src``)::
+
+    python server.py --workers 4
+
+``uvicorn --workers`` spawns fresh interpreters, so every worker imports
+NumPy, OpenCV and the TFLite runtime and reads the model again. Here the
+master process does all of that once:
+
+1. it imports the app and the heavy modules,
+2. it reads the model and labels,
+3. it creates the database tables,
+4. it binds the listening socket.
+
+Then it forks the workers. Each worker builds its own interpreter over the
+shared model buffer and opens its own database connections. The master
+restarts workers that die and forwards SIGINT/SIGTERM to them on shutdown.
+
+A scrape of ``/metrics`` reaches one worker at random, so the workers share
+their metric values through ``METRICS_DIR`` (a fresh temporary directory
+unless configured) and each renders the sum.
+"""
+import argparse
+import gc
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import time
+import traceback
+from pathlib import Path
+from typing import Dict, Optional
+
+import uvicorn
+
+# A worker that dies sooner than this after starting is restarted after a delay
+MIN_WORKER_LIFETIME = 1.0
+
+SHUTDOWN_SIGNALS = {signal.SIGINT, signal.SIGTERM}
+
+
+def preload():
+    """Import the app and load everything the workers can share."""
+    import main
+    from app.core.model_manager import model_manager
+    from app.db.database import engine
+
+    main.prepare()
+    model_manager.preload()
+    # Connections must not cross the fork; workers open their own
+    engine.dispose()
+    return main.app
+
+
+def prepare_metrics_dir() -> Optional[Path]:
+    """Give the workers an empty metrics directory; return it if created here."""
+    from app.core.config import settings
+
+    if settings.METRICS_DIR is None:
+        settings.METRICS_DIR = Path(tempfile.mkdtemp(prefix="visual-ai-metrics-"))
+        return settings.METRICS_DIR
+    # Values left by a previous run would inflate the totals
+    settings.METRICS_DIR.mkdir(parents=True, exist_ok=True)
+    for path in settings.METRICS_DIR.glob("*.json"):
+        path.unlink()
+    return None
+
+
+def _run_worker(config: uvicorn.Config, sock) -> None:
+    for signum in SHUTDOWN_SIGNALS:
+        signal.signal(signum, signal.SIG_DFL)
+    signal.pthread_sigmask(signal.SIG_UNBLOCK, SHUTDOWN_SIGNALS)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def serve(host: str, port: int, workers: int, log_level: str = "info") -> None:
+    """Preload the app, fork ``workers`` processes and supervise them."""
+    app = preload()
+    created_metrics_dir = prepare_metrics_dir()
+    config = uvicorn.Config(app, host=host, port=port, log_level=log_level)
+    sock = config.bind_socket()
+
+    # Move everything allocated so far out of the collector's reach, so GC
+    # passes in the workers do not write to (and so copy) the shared pages.
+    gc.freeze()
+
+    children: Dict[int, float] = {}
+    stopping = False
+
+    def spawn() -> None:
+        # Block shutdown signals across the fork so a new worker cannot run
+        # the master's handler before it installs its own
+        signal.pthread_sigmask(signal.SIG_BLOCK, SHUTDOWN_SIGNALS)
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                _run_worker(config, sock)
+            except BaseException:
+                traceback.print_exc()
+                code = 1
+            finally:
+                os._exit(code)
+        children[pid] = time.monotonic()
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, SHUTDOWN_SIGNALS)
+
+    def stop(signum, frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    for signum in SHUTDOWN_SIGNALS:
+        signal.signal(signum, stop)
+
+    for _ in range(workers):
+        spawn()
+    print(f"Started {workers} workers from master {os.getpid()}", flush=True)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        started = children.pop(pid, None)
+        if started is None or stopping:
+            continue
+        print(f"Worker {pid} exited with status {status}, restarting", flush=True)
+        if time.monotonic() - started < MIN_WORKER_LIFETIME:
+            time.sleep(MIN_WORKER_LIFETIME)
+        if not stopping:
+            spawn()
+
+    sock.close()
+    if created_metrics_dir is not None:
+        shutil.rmtree(created_metrics_dir, ignore_errors=True)
+
+
+def main(argv=None) -> int:
+    from app.core.config import settings
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=settings.HOST)
+    parser.add_argument("--port", type=int, default=settings.PORT)
+    parser.add_argument("--workers", type=int, default=max(1, settings.WORKERS))
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+
+    serve(args.host, args.port, args.workers, log_level=args.log_level)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
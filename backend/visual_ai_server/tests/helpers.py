@@ -0,0 +1,72 @@
+"""Shared setup for the API tests."""
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.core.model_manager import model_manager
+from app.db.database import Base, get_db
+from benchmarks import fixtures
+from main import app, rate_limit_store
+
+
+class ApiTestCase(unittest.TestCase):
+    """Runs the app on the synthetic fixtures and a scratch database.
+
+    The startup handlers do not run; subclasses set up anything else they
+    need after calling ``super().setUp()`` and register it with ``addCleanup``.
+    """
+
+    image_count = 2
+    load_model = True
+
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp_path = Path(tmp.name)
+        self.paths = fixtures.prepare(self.tmp_path, image_count=self.image_count)
+
+        if self.load_model:
+            self.patch_settings(MODEL_PATH=self.paths["model"],
+                                LABELS_PATH=self.paths["labels"])
+            asyncio.run(model_manager.initialize())
+
+        self.engine = create_engine(f"sqlite:///{self.paths['database']}",
+                                    connect_args={"check_same_thread": False})
+        self.addCleanup(self.engine.dispose)
+        Base.metadata.create_all(bind=self.engine)
+        TestingSession = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+
+        def override_get_db():
+            db = TestingSession()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.dependency_overrides[get_db] = override_get_db
+        self.addCleanup(app.dependency_overrides.clear)
+        rate_limit_store.clear()
+        self.client = TestClient(app)
+
+    def patch_settings(self, **values) -> None:
+        """Override settings for the duration of the test."""
+        for name, value in values.items():
+            patcher = mock.patch.object(settings, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def create_prediction(self, image_path: Path):
+        return self.client.post("/api/predictions/", json={
+            "image_path": str(image_path),
+            "bbox_left": 0.1,
+            "bbox_top": 0.2,
+            "bbox_right": 0.6,
+            "bbox_bottom": 0.9,
+        })
@@ -0,0 +1,167 @@
+import asyncio
+import unittest
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core import admission
+
+
+class TestRateLimitStore(unittest.IsolatedAsyncioTestCase):
+    """Unit tests for the in-memory token bucket."""
+
+    async def test_burst_then_limit(self) -> None:
+        """Test a client gets its burst, then must wait for a refill."""
+        store = admission.InMemoryRateLimitStore()
+
+        waits = [await store.take("client", rate=1.0, burst=3) for _ in range(4)]
+
+        self.assertEqual(waits[:3], [0.0, 0.0, 0.0])
+        self.assertGreater(waits[3], 0.9)
+        self.assertEqual(await store.take("other", rate=1.0, burst=3), 0.0)
+
+    async def test_eviction(self) -> None:
+        """Test the least recently seen clients are evicted."""
+        store = admission.InMemoryRateLimitStore(max_keys=2)
+        for key in ("a", "b", "c"):
+            await store.take(key, rate=1.0, burst=1)
+
+        self.assertEqual(await store.take("a", rate=1.0, burst=1), 0.0)
+        self.assertGreater(await store.take("c", rate=1.0, burst=1), 0.0)
+
+    async def test_incomplete_store(self) -> None:
+        """Test a store without ``take`` fails when created."""
+        class SharedStore(admission.RateLimitStore):
+            pass
+
+        with self.assertRaises(TypeError):
+            SharedStore()
+
+
+class TestConcurrencyLimiter(unittest.IsolatedAsyncioTestCase):
+    """Unit tests for the concurrency limit and wait queue."""
+
+    async def test_queue_handoff(self) -> None:
+        """Test a queued request gets the slot when one is released."""
+        limiter = admission.ConcurrencyLimiter(limit=1, queue_size=1, queue_timeout=1.0)
+        await limiter.acquire()
+
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        self.assertFalse(waiter.done())
+
+        limiter.release()
+        await waiter
+        self.assertEqual(limiter.active, 1)
+        limiter.release()
+        self.assertEqual(limiter.active, 0)
+
+    async def test_queue_full(self) -> None:
+        """Test requests beyond the queue are shed immediately."""
+        limiter = admission.ConcurrencyLimiter(limit=1, queue_size=1, queue_timeout=1.0)
+        await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+
+        with self.assertRaises(admission.AdmissionRejected) as ctx:
+            await limiter.acquire()
+        self.assertEqual(ctx.exception.reason, "queue_full")
+
+        waiter.cancel()
+        limiter.release()
+
+    async def test_queue_timeout(self) -> None:
+        """Test queued requests give up after the timeout."""
+        limiter = admission.ConcurrencyLimiter(limit=1, queue_size=4, queue_timeout=0.01)
+        await limiter.acquire()
+
+        with self.assertRaises(admission.AdmissionRejected) as ctx:
+            await limiter.acquire()
+        self.assertEqual(ctx.exception.reason, "queue_timeout")
+
+        limiter.release()
+        self.assertEqual(limiter.active, 0)
+
+
+class TestAdmissionMiddleware(unittest.TestCase):
+    """Tests for rejections returned by the admission middleware."""
+
+    def _client(self, limiter, rate=0.0, burst=1, **options) -> TestClient:
+        app = FastAPI()
+        app.add_middleware(admission.AdmissionMiddleware, limiter=limiter,
+                           store=admission.InMemoryRateLimitStore(), rate=rate, burst=burst,
+                           **options)
+
+        @app.post("/api/predictions/")
+        async def create():
+            return {"ok": True}
+
+        @app.get("/api/health")
+        async def health():
+            return {"status": "healthy"}
+
+        return TestClient(app)
+
+    def test_rate_limited(self) -> None:
+        """Test a client over its rate gets 429 with Retry-After."""
+        limiter = admission.ConcurrencyLimiter(limit=1, queue_size=0, queue_timeout=1.0)
+        client = self._client(limiter, rate=0.5, burst=1)
+
+        self.assertEqual(client.post("/api/predictions/").status_code, 200)
+        response = client.post("/api/predictions/")
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.headers["retry-after"], "2")
+        self.assertEqual(client.get("/api/health").status_code, 200)
+
+    def test_forwarded_for_spoofing(self) -> None:
+        """Test a forged leading X-Forwarded-For entry does not get a new bucket."""
+        limiter = admission.ConcurrencyLimiter(limit=1, queue_size=0, queue_timeout=1.0)
+        client = self._client(limiter, rate=0.5, burst=1, trust_forwarded_for=True)
+
+        # The proxy appends the real client address after whatever was sent
+        first = client.post("/api/predictions/",
+                            headers={"X-Forwarded-For": "10.0.0.1, 203.0.113.7"})
+        spoofed = client.post("/api/predictions/",
+                              headers={"X-Forwarded-For": "10.0.0.2, 203.0.113.7"})
+        other = client.post("/api/predictions/",
+                            headers={"X-Forwarded-For": "10.0.0.1, 198.51.100.9"})
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(spoofed.status_code, 429)
+        self.assertEqual(other.status_code, 200)
+
+    def test_forwarded_for_proxy_depth(self) -> None:
+        """Test the key is taken at the configured number of trusted proxies."""
+        limiter = admission.ConcurrencyLimiter(limit=1, queue_size=0, queue_timeout=1.0)
+        middleware = admission.AdmissionMiddleware(
+            None, limiter=limiter, store=admission.InMemoryRateLimitStore(), rate=1.0,
+            burst=1, trust_forwarded_for=True, trusted_proxies=2)
+
+        def key(*values):
+            return middleware.client_key({
+                "headers": [(b"x-forwarded-for", value.encode()) for value in values],
+                "client": ("192.0.2.1", 1234),
+            })
+
+        self.assertEqual(key("forged, 203.0.113.7, 10.1.1.1"), "203.0.113.7")
+        # Repeated headers are one list, in order
+        self.assertEqual(key("forged", "203.0.113.7, 10.1.1.1"), "203.0.113.7")
+        # Fewer entries than proxies: fall back to the peer address
+        self.assertEqual(key("10.1.1.1"), "192.0.2.1")
+
+    def test_overloaded(self) -> None:
+        """Test requests are shed with 503 when no slot is free."""
+        limiter = admission.ConcurrencyLimiter(limit=1, queue_size=0, queue_timeout=1.0)
+        limiter.active = 1  # Simulate an inference already running
+        client = self._client(limiter)
+
+        response = client.post("/api/predictions/")
+
+        self.assertEqual(response.status_code, 503)
+        self.assertIn("retry-after", response.headers)
+        self.assertEqual(client.get("/api/health").status_code, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
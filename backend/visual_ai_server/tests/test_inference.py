@@ -1,40 +1,100 @@
+import tempfile
 import unittest
+from pathlib import Path
+
 import numpy as np
-from src.inference import ImageClassifier
-from src.preprocessor import preprocess_image
-import os
 
-class TestImageClassifier(unittest.TestCase):
-    """Unit tests for ImageClassifier functionality."""
+from app.core.config import settings
+from app.core.model_manager import ModelManager
+from benchmarks import fixtures
+
+
+class TestModelManager(unittest.IsolatedAsyncioTestCase):
+    """Unit tests for ModelManager against the synthetic benchmark model."""
+
+    async def asyncSetUp(self) -> None:
+        """Generate fixtures and initialize the model manager."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.paths = fixtures.prepare(Path(self.tmp.name), image_count=2)
+        self.original = (settings.MODEL_PATH, settings.LABELS_PATH)
+        settings.MODEL_PATH = self.paths["model"]
+        settings.LABELS_PATH = self.paths["labels"]
+
+        self.manager = ModelManager()
+        await self.manager.initialize()
+        self.bbox = {'left': 0.1, 'top': 0.2, 'right': 0.6, 'bottom': 0.9}
 
-    def setUp(self) -> None:
-        """Set up test environment."""
-        self.model_path = "models/mobilenetv3_small.tflite"
-        self.labels_path = "models/labels.txt"
-        self.test_image = "tests/test_image.jpg"
-        self.classifier = ImageClassifier(self.model_path, self.labels_path)
+    async def asyncTearDown(self) -> None:
+        settings.MODEL_PATH, settings.LABELS_PATH = self.original
+        self.tmp.cleanup()
 
     def test_load_labels(self) -> None:
         """Test loading of ImageNet labels."""
-        labels = self.classifier._load_labels(self.labels_path)
-        self.assertGreater(len(labels), 0, "Labels should not be empty")
-        self.assertIsInstance(labels[0], str, "Labels should be strings")
-
-    def test_run_inference(self) -> None:
-        """Test inference on a sample image."""
-        if not os.path.exists(self.test_image):
-            self.skipTest("Test image not found")
-        
-        with open(self.test_image, "rb") as f:
-            image_data = f.read()
-        
-        processed_image = preprocess_image(image_data)
-        result = self.classifier.run_inference(image_data, [])
-        
-        self.assertIn("label", result, "Result should contain label")
-        self.assertIn("confidence", result, "Result should contain confidence")
-        self.assertIsInstance(result["confidence"], float, "Confidence should be float")
-        self.assertGreaterEqual(result["confidence"], 0.0, "Confidence should be non-negative")
+        self.assertGreater(len(self.manager.labels), 0, "Labels should not be empty")
+        self.assertIsInstance(self.manager.labels[0], str, "Labels should be strings")
+
+    def test_preprocess_image(self) -> None:
+        """Test crop, resize and normalization of an image."""
+        image = self.manager.preprocess_image(self.paths["images"][0], self.bbox)
+
+        self.assertEqual(image.shape, (1, settings.IMAGE_SIZE, settings.IMAGE_SIZE, 3))
+        self.assertEqual(image.dtype, np.float32)
+        self.assertGreaterEqual(image.min(), -1.0)
+        self.assertLessEqual(image.max(), 1.0)
+
+    def test_preprocess_missing_image(self) -> None:
+        """Test that unreadable images are rejected."""
+        with self.assertRaises(ValueError):
+            self.manager.preprocess_image(Path(self.tmp.name) / "missing.jpg", self.bbox)
+
+    async def test_process_image(self) -> None:
+        """Test the full pipeline on a sample image."""
+        results = await self.manager.process_image(self.paths["images"][0], self.bbox)
+
+        self.assertLessEqual(len(results), 5)
+        for result in results:
+            self.assertIn(result["label"], self.manager.labels)
+            self.assertIsInstance(result["confidence"], float, "Confidence should be float")
+            self.assertGreater(result["confidence"], settings.CONFIDENCE_THRESHOLD)
+
+    def test_postprocess(self) -> None:
+        """Test thresholding, ordering and top-5 truncation of scores."""
+        scores = np.zeros((1, len(self.manager.labels)), dtype=np.float32)
+        scores[0, :7] = [0.05, 0.3, 0.2, 0.15, 0.12, 0.11, 0.07]
+
+        results = self.manager.postprocess(scores)
+
+        self.assertEqual([r["label"] for r in results],
+                         [self.manager.labels[i] for i in (1, 2, 3, 4, 5)])
+        confidences = [r["confidence"] for r in results]
+        self.assertEqual(confidences, sorted(confidences, reverse=True))
+
+    def test_classify_returns_embedding(self) -> None:
+        """Test the embedding output is read alongside the predictions."""
+        self.assertEqual(self.manager.embedding_size, fixtures.EMBEDDING_SIZE)
+
+        preprocessed = self.manager.preprocess_image(self.paths["images"][0], self.bbox)
+        predictions, embedding = self.manager.classify(preprocessed)
+
+        self.assertEqual(predictions, self.manager.run_inference(preprocessed))
+        self.assertEqual(embedding.shape, (fixtures.EMBEDDING_SIZE,))
+
+    async def test_named_embedding_tensor(self) -> None:
+        """Test an intermediate tensor can be selected by name."""
+        original = settings.EMBEDDING_TENSOR
+        settings.EMBEDDING_TENSOR = "pooled"
+        try:
+            manager = ModelManager()
+            await manager.initialize()
+            preprocessed = manager.preprocess_image(self.paths["images"][0], self.bbox)
+            _, embedding = manager.classify(preprocessed)
+        finally:
+            settings.EMBEDDING_TENSOR = original
+
+        self.assertEqual(manager.embedding_size, 3)
+        self.assertEqual(embedding.shape, (3,))
+        self.assertGreater(float(np.abs(embedding).sum()), 0.0)
+
 
 if __name__ == "__main__":
-    unittest.main()
\ No newline at end of file
+    unittest.main()
@@ -0,0 +1,91 @@
+import os
+import tempfile
+import unittest
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core import metrics
+
+
+class TestMetrics(unittest.TestCase):
+    """Unit tests for metric rendering and the metrics middleware."""
+
+    def test_histogram_render(self) -> None:
+        """Test Prometheus exposition of a labelled histogram."""
+        histogram = metrics.Histogram("test_seconds", "Test.", ("stage",), buckets=(0.1, 1.0))
+        histogram.observe(0.05, stage="a")
+        histogram.observe(0.5, stage="a")
+
+        text = histogram.render()
+
+        self.assertIn("# TYPE test_seconds histogram", text)
+        self.assertIn('test_seconds_bucket{stage="a",le="0.1"} 1', text)
+        self.assertIn('test_seconds_bucket{stage="a",le="1.0"} 2', text)
+        self.assertIn('test_seconds_bucket{stage="a",le="+Inf"} 2', text)
+        self.assertIn('test_seconds_count{stage="a"} 2', text)
+
+    def test_label_mismatch(self) -> None:
+        """Test that missing labels are rejected."""
+        counter = metrics.Counter("test_total", "Test.", ("result",))
+        with self.assertRaises(ValueError):
+            counter.inc()
+
+    def test_middleware(self) -> None:
+        """Test stage timings reach the Server-Timing header and metrics."""
+        app = FastAPI()
+        app.add_middleware(metrics.MetricsMiddleware)
+
+        @app.get("/items/{item_id}")
+        async def read_item(item_id: int):
+            with metrics.stage("lookup"):
+                return {"id": item_id}
+
+        before = metrics.http_requests.value(method="GET", route="/items/{item_id}",
+                                             status="200")
+        response = TestClient(app).get("/items/3")
+
+        self.assertEqual(response.status_code, 200)
+        timing = response.headers["server-timing"]
+        self.assertRegex(timing, r"^lookup;dur=[\d.]+, total;dur=[\d.]+$")
+        self.assertEqual(metrics.http_requests.value(method="GET", route="/items/{item_id}",
+                                                     status="200"), before + 1)
+        self.assertIn('visual_ai_stage_duration_seconds_count{stage="lookup"}',
+                      metrics.registry.render())
+
+
+class TestMultiprocessRegistry(unittest.TestCase):
+    """Tests for aggregating metrics across worker processes."""
+
+    def _registry(self, directory: str, pid: int) -> metrics.Registry:
+        registry = metrics.Registry()
+        registry.requests = registry.counter("test_requests_total", "Test.", ("route",))
+        registry.active = registry.gauge("test_active", "Test.")
+        registry.latency = registry.histogram("test_seconds", "Test.", buckets=(0.1,))
+        registry.enable_multiprocess(directory, interval=0)
+        registry.pid = pid
+        return registry
+
+    def test_sums_across_workers(self) -> None:
+        """Test any worker renders the sum, and dead workers keep only counters."""
+        with tempfile.TemporaryDirectory() as tmp:
+            this = self._registry(tmp, os.getpid())
+            other = self._registry(tmp, os.getppid())
+            exited = self._registry(tmp, 2 ** 22 + 1)  # Above pid_max, never alive
+            for registry, count in ((this, 1), (other, 2), (exited, 4)):
+                registry.requests.inc(count, route="/a")
+                registry.active.set(count)
+                registry.latency.observe(0.05 * count)
+                registry.write_snapshot()
+            os.remove(os.path.join(tmp, f"{os.getpid()}.json"))
+
+            text = this.render()
+
+        self.assertIn('test_requests_total{route="/a"} 7.0', text)
+        self.assertIn("test_active 3.0", text)
+        self.assertIn('test_seconds_bucket{le="0.1"} 2', text)
+        self.assertIn("test_seconds_count 3", text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+import gzip
+import unittest
+from unittest import mock
+
+from app.core import compression
+from tests.helpers import ApiTestCase
+
+
+class TestPredictionsApi(ApiTestCase):
+    """API tests for the predictions router on a scratch database."""
+
+    def _create(self, index: int = 0):
+        return self.create_prediction(self.paths["images"][index])
+
+    def test_create_prediction(self) -> None:
+        """Test the create response carries the stored row and all results."""
+        response = self._create()
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertIsInstance(data["id"], int)
+        self.assertIn("timestamp", data)
+        self.assertEqual(data["label"], data["predictions"][0]["label"])
+
+    def test_missing_image(self) -> None:
+        """Test that a missing image is a 404, not a server error."""
+        response = self.client.post("/api/predictions/", json={
+            "image_path": str(self.tmp_path / "missing.jpg"),
+            "bbox_left": 0, "bbox_top": 0, "bbox_right": 1, "bbox_bottom": 1,
+        })
+        self.assertEqual(response.status_code, 404)
+
+    def test_list_predictions(self) -> None:
+        """Test listing with all fields and with a field selection."""
+        self._create(0)
+        self._create(1)
+
+        full = self.client.get("/api/predictions/").json()
+        self.assertEqual(len(full), 2)
+        self.assertEqual(set(full[0]), {
+            "id", "image_path", "label", "confidence", "timestamp", "is_synced",
+            "bbox_left", "bbox_top", "bbox_right", "bbox_bottom",
+        })
+
+        lean = self.client.get("/api/predictions/", params={"fields": "id,label"}).json()
+        self.assertEqual(lean, [{"id": row["id"], "label": row["label"]} for row in full])
+
+        single = self.client.get(f"/api/predictions/{full[1]['id']}",
+                                 params={"fields": "confidence"}).json()
+        self.assertEqual(single, {"confidence": full[1]["confidence"]})
+
+    def test_unknown_field(self) -> None:
+        """Test that unknown fields are rejected."""
+        response = self.client.get("/api/predictions/", params={"fields": "id,secret"})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.get("/api/predictions/", params={"fields": ","})
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(response.json()["detail"].startswith("No fields given"))
+
+    def test_openapi_fields_optional(self) -> None:
+        """Test the documented read schemas allow `fields`-limited payloads."""
+        schemas = self.client.get("/openapi.json").json()["components"]["schemas"]
+        self.assertNotIn("required", schemas["PredictionFields"])
+        self.assertEqual(schemas["SimilarPrediction"]["required"], ["id", "similarity"])
+
+    def test_compression(self) -> None:
+        """Test large responses are compressed and small ones are not."""
+        for i in range(12):
+            self._create(i % 2)
+
+        response = self.client.get("/api/predictions/",
+                                   headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        self.assertEqual(len(response.json()), 12)
+
+        raw = self.client.get("/api/predictions/", params={"fields": "id", "limit": 1},
+                              headers={"Accept-Encoding": "gzip"})
+        self.assertNotIn("content-encoding", raw.headers)
+
+    def test_gzip_roundtrip(self) -> None:
+        """Test the compressed body and length header match."""
+        for i in range(12):
+            self._create(i % 2)
+
+        with self.client.stream("GET", "/api/predictions/",
+                                headers={"Accept-Encoding": "gzip"}) as response:
+            body = b"".join(response.iter_raw())
+        self.assertEqual(int(response.headers["content-length"]), len(body))
+        self.assertTrue(gzip.decompress(body).startswith(b"[{"))
+
+    @unittest.skipUnless(compression.brotli, "brotli is not installed")
+    def test_brotli_preferred(self) -> None:
+        """Test Brotli is chosen when the client accepts it."""
+        for i in range(12):
+            self._create(i % 2)
+
+        response = self.client.get("/api/predictions/",
+                                   headers={"Accept-Encoding": "gzip, br"})
+        self.assertEqual(response.headers["content-encoding"], "br")
+        self.assertEqual(len(response.json()), 12)
+
+
+class TestAcceptEncoding(unittest.TestCase):
+    """Unit tests for Accept-Encoding negotiation."""
+
+    def choose(self, header: str):
+        accepted = compression._accepted_encodings([(b"accept-encoding", header.encode())])
+        with mock.patch.object(compression, "brotli", object()):
+            return compression.choose_encoding(accepted)
+
+    def test_refusals(self) -> None:
+        """Test any spelling of a zero weight refuses the encoding."""
+        self.assertEqual(self.choose("br; q=0, gzip"), "gzip")
+        self.assertEqual(self.choose("br;q=0.0, gzip"), "gzip")
+        self.assertIsNone(self.choose("gzip;q=0.0"))
+        self.assertIsNone(self.choose("gzip; q=0"))
+        self.assertIsNone(self.choose("gzip;q=0.000"))
+        self.assertIsNone(self.choose("gzip;q=bogus"))
+
+    def test_weighted_and_wildcard(self) -> None:
+        """Test non-zero weights and `*` accept encodings."""
+        self.assertEqual(self.choose("gzip;q=0.5, br;q=0.1"), "br")
+        self.assertEqual(self.choose("GZIP ; Q=1"), "gzip")
+        self.assertEqual(self.choose("*"), "br")
+        self.assertEqual(self.choose("br;q=0, *;q=0.1"), "gzip")
+        self.assertIsNone(self.choose("identity"))
+
+
+if __name__ == "__main__":
+    unittest.main()
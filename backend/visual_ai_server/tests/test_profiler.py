@@ -0,0 +1,136 @@
+import threading
+import time
+import tracemalloc
+import unittest
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core import profiler
+from app.core.config import settings
+from app.routers import admin
+
+
+def _busy_loop(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(range(1000))
+
+
+class TestSampling(unittest.TestCase):
+    """Unit tests for the stack sampler."""
+
+    def test_sample_stacks(self) -> None:
+        """Test that a busy thread shows up in collapsed stacks."""
+        stop = threading.Event()
+        worker = threading.Thread(target=_busy_loop, args=(stop,), name="busy-worker")
+        worker.start()
+        try:
+            stacks = profiler.sample_stacks(0.1, 0.005)
+        finally:
+            stop.set()
+            worker.join()
+
+        folded = profiler.collapse(stacks)
+        busy = [line for line in folded.splitlines() if line.startswith("busy-worker;")]
+        self.assertTrue(busy, "Busy thread should be sampled")
+        self.assertIn("_busy_loop (tests/test_profiler.py:", busy[0])
+        self.assertRegex(busy[0], r" \d+$")
+
+    def test_single_profile(self) -> None:
+        """Test that overlapping profiles are rejected."""
+        worker = threading.Thread(target=profiler.sample_stacks, args=(0.2, 0.01))
+        worker.start()
+        time.sleep(0.05)
+        try:
+            with self.assertRaises(profiler.ProfilerBusyError):
+                profiler.sample_stacks(0.01, 0.01)
+        finally:
+            worker.join()
+
+
+class TestMemoryTracing(unittest.TestCase):
+    """Tests for sharing tracemalloc between windows and traced requests."""
+
+    def test_request_ends_during_window(self) -> None:
+        """Test a traced request finishing mid-window does not stop tracing."""
+        results = {}
+
+        def window():
+            try:
+                results["window"] = profiler.memory_window(0.3)
+            except Exception as e:
+                results["error"] = e
+
+        profiler._start_trace()
+        worker = threading.Thread(target=window)
+        worker.start()
+        time.sleep(0.1)
+        profiler._stop_trace()
+        worker.join()
+
+        self.assertNotIn("error", results)
+        self.assertIn("top", results["window"])
+        self.assertFalse(tracemalloc.is_tracing())
+
+
+class TestAdminEndpoints(unittest.TestCase):
+    """Tests for admin-only profiling endpoints."""
+
+    def setUp(self) -> None:
+        self.original = settings.ADMIN_TOKEN
+        settings.ADMIN_TOKEN = "secret"
+        app = FastAPI()
+        app.add_middleware(profiler.MemoryProfileMiddleware, is_authorized=admin.is_admin_token)
+        app.include_router(admin.router, prefix="/api/admin")
+
+        @app.get("/allocate")
+        async def allocate():
+            return {"size": len([bytes(1024) for _ in range(100)])}
+
+        self.client = TestClient(app)
+        self.headers = {"X-Admin-Token": "secret"}
+
+    def tearDown(self) -> None:
+        settings.ADMIN_TOKEN = self.original
+
+    def test_requires_token(self) -> None:
+        """Test that profiling needs the admin token and is off without one."""
+        response = self.client.post("/api/admin/profile/cpu", params={"seconds": 0.01})
+        self.assertEqual(response.status_code, 403)
+
+        settings.ADMIN_TOKEN = ""
+        response = self.client.post("/api/admin/profile/cpu", params={"seconds": 0.01},
+                                    headers=self.headers)
+        self.assertEqual(response.status_code, 404)
+
+    def test_profile_cpu(self) -> None:
+        """Test the CPU profile returns folded stacks."""
+        response = self.client.post("/api/admin/profile/cpu",
+                                    params={"seconds": 0.05, "interval_ms": 5},
+                                    headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response.text.splitlines()[0], r"^[^;]+(;[^;]+)* \d+$")
+
+    def test_profile_duration_limit(self) -> None:
+        """Test that overly long profiles are refused."""
+        response = self.client.post("/api/admin/profile/cpu",
+                                    params={"seconds": settings.PROFILE_MAX_SECONDS + 1},
+                                    headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+    def test_request_memory_profile(self) -> None:
+        """Test per-request tracemalloc snapshots for flagged requests."""
+        plain = self.client.get("/allocate")
+        self.assertNotIn("x-memory-profile-id", plain.headers)
+
+        traced = self.client.get("/allocate", headers={**self.headers, "X-Profile-Memory": "1"})
+        profile_id = int(traced.headers["x-memory-profile-id"])
+
+        profiles = self.client.get("/api/admin/profile/requests", headers=self.headers).json()
+        self.assertEqual(profiles[0]["id"], profile_id)
+        self.assertEqual(profiles[0]["path"], "/allocate")
+        self.assertIn("top", profiles[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
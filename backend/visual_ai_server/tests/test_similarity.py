@@ -0,0 +1,196 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from app.core.metrics import cache_requests
+from app.core.model_manager import model_manager
+from app.core.similarity import EmbeddingStore, fingerprint, similarity_index
+from tests.helpers import ApiTestCase
+
+
+class TestEmbeddingStore(unittest.TestCase):
+    """Unit tests for the append-only vector store."""
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "vectors.f16"
+        self.store = EmbeddingStore(self.path, dim=8)
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_search_ranks_by_cosine_similarity(self) -> None:
+        """Test results are ordered by similarity and exclude the query id."""
+        base = np.arange(1, 9, dtype=np.float32)
+        self.store.append(1, base)
+        self.store.append(2, base * 3 + 0.5)
+        self.store.append(3, -base)
+
+        results = self.store.search(base, k=3)
+        self.assertEqual([key for key, _ in results], [1, 2, 3])
+        self.assertAlmostEqual(results[0][1], 1.0, places=3)
+        self.assertAlmostEqual(results[2][1], -1.0, places=3)
+
+        self.assertEqual([key for key, _ in self.store.search(base, k=5, exclude=1)], [2, 3])
+
+    def test_get_and_reopen(self) -> None:
+        """Test vectors are stored normalized and visible to other instances."""
+        self.store.append(7, np.full(8, 2.0))
+        reopened = EmbeddingStore(self.path, dim=8)
+
+        self.assertEqual(len(reopened), 1)
+        np.testing.assert_allclose(reopened.get(7), np.full(8, 8 ** -0.5), rtol=1e-3)
+        self.assertIsNone(reopened.get(8))
+
+        # Appends by one instance show up in the other without reopening
+        self.store.append(8, np.ones(8))
+        self.assertIsNotNone(reopened.get(8))
+
+    def test_partial_record_is_dropped(self) -> None:
+        """Test a torn write at the end of the file is truncated on open."""
+        self.store.append(1, np.ones(8))
+        with open(self.path, "ab") as f:
+            f.write(b"\x00" * 5)
+
+        reopened = EmbeddingStore(self.path, dim=8)
+        reopened.append(2, np.ones(8))
+        self.assertEqual([key for key, _ in reopened.search(np.ones(8), k=2)], [1, 2])
+
+    def test_capped_cache_matches_scan(self) -> None:
+        """Test rows past the float32 cache limit are scanned from the map."""
+        rng = np.random.RandomState(0)
+        for key in range(10):
+            self.store.append(key, rng.standard_normal(8))
+        # Two rows of 8 float32 values fit; the rest is decoded in blocks of 3
+        capped = EmbeddingStore(self.path, dim=8, cache_bytes=2 * 8 * 4)
+        capped.BLOCK_ROWS = 3
+
+        query = rng.standard_normal(8)
+        self.assertEqual(len(capped._mapped()[1]), 2)
+        expected = self.store.search(query, k=10)
+        self.assertEqual([key for key, _ in capped.search(query, k=10)],
+                         [key for key, _ in expected])
+
+    def test_empty_store(self) -> None:
+        """Test searching an empty store returns nothing."""
+        self.assertEqual(self.store.search(np.ones(8)), [])
+
+
+class TestSimilarityApi(ApiTestCase):
+    """API tests for near-duplicate reuse and the similar-predictions endpoint."""
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.patch_settings(NEAR_DUPLICATE_THRESHOLD=0.999)
+        similarity_index.open(self.paths["embeddings"], model_manager.embedding_size)
+        self.addCleanup(similarity_index.close)
+
+        # Upside down, so its crop is unlike the other images
+        image = cv2.imread(str(self.paths["images"][0]))
+        self.flipped = self.tmp_path / "flipped.jpg"
+        cv2.imwrite(str(self.flipped), cv2.flip(image, -1))
+
+    def test_near_duplicate_reuses_result(self) -> None:
+        """Test a repeated crop reuses the stored result instead of inference."""
+        first = self.create_prediction(self.paths["images"][0]).json()
+        self.assertIsNone(first["duplicate_of"])
+
+        hits = cache_requests.value(result="hit")
+        second = self.create_prediction(self.paths["images"][0]).json()
+        self.assertEqual(second["duplicate_of"], first["id"])
+        self.assertEqual(second["predictions"], first["predictions"])
+        self.assertNotEqual(second["id"], first["id"])
+        self.assertEqual(cache_requests.value(result="hit"), hits + 1)
+
+        other = self.create_prediction(self.flipped).json()
+        self.assertIsNone(other["duplicate_of"])
+
+    def test_reuse_after_cache_eviction(self) -> None:
+        """Test the full stored result is reused once the cache no longer has it."""
+        first = self.create_prediction(self.paths["images"][0]).json()
+        self.assertGreater(len(first["predictions"]), 1)
+
+        # As if evicted, or stored by another worker
+        similarity_index.results.clear()
+        second = self.create_prediction(self.paths["images"][0]).json()
+        self.assertEqual(second["duplicate_of"], first["id"])
+        self.assertEqual(second["predictions"], first["predictions"])
+
+        similarity_index.results.clear()
+        third = self.create_prediction(self.paths["images"][0]).json()
+        self.assertEqual(third["predictions"], first["predictions"])
+
+    def test_changed_colour_runs_inference(self) -> None:
+        """Test crops with swapped channels or shifted brightness are not reused."""
+        image = cv2.imread(str(self.paths["images"][0]))
+        swapped = self.tmp_path / "swapped.jpg"
+        brighter = self.tmp_path / "brighter.jpg"
+        cv2.imwrite(str(swapped), image[:, :, ::-1])
+        cv2.imwrite(str(brighter), cv2.add(image, (12, 12, 12, 0)))
+
+        self.create_prediction(self.paths["images"][0])
+        for path in (swapped, brighter):
+            result = self.create_prediction(path).json()
+            self.assertIsNone(result["duplicate_of"])
+            predictions, _ = model_manager.classify(model_manager.preprocess_image(
+                path, {"left": 0.1, "top": 0.2, "right": 0.6, "bottom": 0.9}))
+            self.assertEqual(result["predictions"], predictions)
+
+    def test_disabled_threshold_runs_inference(self) -> None:
+        """Test a threshold of 0 always runs the model."""
+        self.patch_settings(NEAR_DUPLICATE_THRESHOLD=0)
+        first = self.create_prediction(self.paths["images"][0]).json()
+        second = self.create_prediction(self.paths["images"][0]).json()
+        self.assertIsNone(second["duplicate_of"])
+        self.assertEqual(second["predictions"], first["predictions"])
+
+    def test_similar_predictions(self) -> None:
+        """Test similar predictions come back ranked, without the query itself."""
+        ids = [self.create_prediction(path).json()["id"]
+               for path in (self.paths["images"][0], self.paths["images"][1], self.flipped)]
+
+        response = self.client.get(f"/api/predictions/{ids[0]}/similar",
+                                   params={"k": 2, "fields": "label"})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()
+        self.assertEqual(len(results), 2)
+        self.assertEqual(set(results[0]), {"id", "label", "similarity"})
+        self.assertNotIn(ids[0], [result["id"] for result in results])
+        self.assertGreaterEqual(results[0]["similarity"], results[1]["similarity"])
+
+    def test_similar_unknown_prediction(self) -> None:
+        """Test predictions without a stored embedding are a 404."""
+        response = self.client.get("/api/predictions/999/similar")
+        self.assertEqual(response.status_code, 404)
+
+    def test_similar_without_embeddings(self) -> None:
+        """Test the endpoint is unavailable when the model has no embedding."""
+        similarity_index.open(self.paths["embeddings"], embedding_size=0)
+        response = self.client.get("/api/predictions/1/similar")
+        self.assertEqual(response.status_code, 503)
+
+
+class TestFingerprint(unittest.TestCase):
+    """Unit tests for crop fingerprints."""
+
+    def test_colour_and_brightness_sensitive(self) -> None:
+        """Test the fingerprint keeps absolute colour and brightness."""
+        rng = np.random.RandomState(0)
+        image = rng.uniform(-0.3, 0.3, size=(1, 32, 32, 3)).astype(np.float32)
+        image += np.array([0.4, 0.0, -0.4], dtype=np.float32)  # Reddish
+
+        self.assertAlmostEqual(float(fingerprint(image) @ fingerprint(image)), 1.0, places=5)
+        noisy = image + rng.normal(0, 0.01, size=image.shape).astype(np.float32)
+        self.assertGreater(float(fingerprint(image) @ fingerprint(noisy)), 0.999)
+
+        # A uniform shift d scores cos(pi * d / 4)
+        shifted = fingerprint(image) @ fingerprint(image + 0.1)
+        self.assertAlmostEqual(float(shifted), np.cos(np.pi * 0.1 / 4), places=4)
+        swapped = fingerprint(image) @ fingerprint(image[..., ::-1].copy())
+        self.assertLess(float(swapped), 0.99)
+
+if __name__ == "__main__":
+    unittest.main()
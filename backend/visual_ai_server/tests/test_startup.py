@@ -0,0 +1,92 @@
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.model_manager import ModelManager, model_manager
+from benchmarks import fixtures
+from main import app
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+
+
+class TestLazyStartup(unittest.TestCase):
+    """Tests for deferred imports, side effects and background model loading."""
+
+    def test_import_is_light(self) -> None:
+        """Test importing the app loads no heavy modules and creates no directories."""
+        with tempfile.TemporaryDirectory() as tmp:
+            upload_dir = Path(tmp) / "uploads"
+            code = (
+                "import sys, main; "
+                "print(sorted(m for m in ('numpy', 'cv2', 'tflite_runtime') "
+                "if m in sys.modules))"
+            )
+            output = subprocess.check_output(
+                [sys.executable, "-c", code], cwd=SRC, text=True,
+                env={**os.environ, "UPLOAD_DIR": str(upload_dir)})
+            self.assertEqual(output.strip(), "[]")
+            self.assertFalse(upload_dir.exists())
+
+    def test_predictions_unavailable_while_loading(self) -> None:
+        """Test health answers and predictions return 503 before the model loads."""
+        original = (model_manager.interpreter, app.state.model_status)
+        model_manager.interpreter = None
+        app.state.model_status = "loading"
+        try:
+            client = TestClient(app)
+            health = client.get("/api/health")
+            self.assertEqual(health.status_code, 200)
+            self.assertEqual(health.json()["model"], "loading")
+
+            response = client.post("/api/predictions/", json={
+                "image_path": "missing.jpg",
+                "bbox_left": 0, "bbox_top": 0, "bbox_right": 1, "bbox_bottom": 1,
+            })
+            self.assertEqual(response.status_code, 503)
+
+            app.state.model_status = "failed"
+            self.assertEqual(client.get("/api/health").status_code, 503)
+        finally:
+            model_manager.interpreter, app.state.model_status = original
+
+
+class TestPreload(unittest.TestCase):
+    """Tests for building interpreters over a preloaded model buffer."""
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.paths = fixtures.prepare(Path(self.tmp.name), image_count=1)
+        self.original = (settings.MODEL_PATH, settings.LABELS_PATH)
+        settings.MODEL_PATH = self.paths["model"]
+        settings.LABELS_PATH = self.paths["labels"]
+
+    def tearDown(self) -> None:
+        settings.MODEL_PATH, settings.LABELS_PATH = self.original
+        self.tmp.cleanup()
+
+    def test_preloaded_model_matches_file(self) -> None:
+        """Test a preloaded manager no longer reads the model or labels files."""
+        from_file = ModelManager()
+        asyncio.run(from_file.initialize())
+
+        preloaded = ModelManager()
+        preloaded.preload()
+        self.paths["model"].unlink()
+        self.paths["labels"].unlink()
+        preloaded.load()
+
+        self.assertEqual(preloaded.labels, from_file.labels)
+        bbox = {'left': 0.0, 'top': 0.0, 'right': 1.0, 'bottom': 1.0}
+        image = from_file.preprocess_image(self.paths["images"][0], bbox)
+        self.assertEqual(preloaded.run_inference(image), from_file.run_inference(image))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,173 @@
+import gzip
+import json
+import tempfile
+import unittest
+import uuid
+import zlib
+from pathlib import Path
+
+from sqlalchemy import create_engine, inspect, text
+
+from app.core.compression import BodyTooLargeError, decompress_body
+from app.db.database import init_db
+from tests.helpers import ApiTestCase
+
+
+def make_record(label: str = "hog", **overrides):
+    record = {
+        "idempotency_key": str(uuid.uuid4()),
+        "image_path": "/data/user/0/app/cache/photo.jpg",
+        "label": label,
+        "confidence": 0.8,
+        "bbox_left": 0.1,
+        "bbox_top": 0.2,
+        "bbox_right": 0.6,
+        "bbox_bottom": 0.9,
+        "timestamp": "2026-01-02T03:04:05+02:00",
+    }
+    record.update(overrides)
+    return record
+
+
+class TestSyncApi(ApiTestCase):
+    """API tests for batch upload and delta pulls."""
+
+    load_model = False
+
+    def _sync(self, device_id: str, records=(), cursor: int = 0, encoding: str = "gzip"):
+        body = json.dumps({"device_id": device_id, "cursor": cursor,
+                           "records": list(records)}).encode()
+        headers = {"Content-Type": "application/json"}
+        if encoding == "gzip":
+            body = gzip.compress(body)
+            headers["Content-Encoding"] = "gzip"
+        return self.client.post("/api/sync/", content=body, headers=headers)
+
+    def test_upload_is_idempotent(self) -> None:
+        """Test a replayed batch inserts nothing and returns the same ids."""
+        records = [make_record(), make_record("bow tie")]
+        # A key repeated within the batch is stored once
+        first = self._sync("phone", records + [records[0]]).json()
+        self.assertEqual(first["accepted"], 2)
+        self.assertEqual(first["duplicates"], 1)
+        self.assertEqual(set(first["ids"]), {r["idempotency_key"] for r in records})
+
+        replay = self._sync("phone", records).json()
+        self.assertEqual(replay["accepted"], 0)
+        self.assertEqual(replay["duplicates"], 2)
+        self.assertEqual(replay["ids"], first["ids"])
+
+        rows = self.client.get("/api/predictions/").json()
+        self.assertEqual(len(rows), 2)
+        self.assertTrue(all(row["is_synced"] for row in rows))
+        # Stored in UTC
+        self.assertTrue(rows[0]["timestamp"].startswith("2026-01-02T01:04:05"))
+
+    def test_delta_pull_skips_own_rows(self) -> None:
+        """Test devices pull only rows they did not upload and have not seen."""
+        phone = self._sync("phone", [make_record(), make_record()]).json()
+        # The uploading device gets none of its own rows back
+        self.assertEqual(phone["changes"], [])
+        self.assertEqual(phone["cursor"], max(phone["ids"].values()))
+
+        tablet = self._sync("tablet", [make_record("tabby")]).json()
+        self.assertEqual(len(tablet["changes"]), 2)
+        self.assertEqual(tablet["cursor"], max(tablet["ids"].values()))
+
+        again = self._sync("phone", cursor=phone["cursor"], encoding=None).json()
+        self.assertEqual([row["label"] for row in again["changes"]], ["tabby"])
+        self.assertFalse(again["has_more"])
+
+        latest = self._sync("tablet", cursor=tablet["cursor"]).json()
+        self.assertEqual(latest["changes"], [])
+        self.assertEqual(latest["cursor"], tablet["cursor"])
+
+    def test_paged_changes(self) -> None:
+        """Test pulling changes in pages until has_more is false."""
+        self._sync("phone", [make_record(f"label-{i}") for i in range(5)])
+
+        labels, cursor, has_more = [], 0, True
+        while has_more:
+            page = self.client.get("/api/sync/changes",
+                                   params={"cursor": cursor, "limit": 2}).json()
+            labels += [row["label"] for row in page["changes"]]
+            cursor, has_more = page["cursor"], page["has_more"]
+        self.assertEqual(labels, [f"label-{i}" for i in range(5)])
+
+    def test_rejected_batches(self) -> None:
+        """Test malformed, oversized and unsupported batches are rejected."""
+        self.assertEqual(self._sync("phone", [make_record(confidence=2)]).status_code, 422)
+        self.assertEqual(self._sync("phone", cursor=10 ** 30).status_code, 422)
+        response = self.client.get("/api/sync/changes", params={"cursor": 10 ** 30})
+        self.assertEqual(response.status_code, 422)
+
+        response = self.client.post("/api/sync/", content=b"not gzip",
+                                    headers={"Content-Encoding": "gzip"})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post("/api/sync/", content=b"{}",
+                                    headers={"Content-Encoding": "compress"})
+        self.assertEqual(response.status_code, 415)
+
+        # Too large raw, with and without Content-Length
+        self.patch_settings(SYNC_MAX_BODY_SIZE=1024)
+        response = self.client.post("/api/sync/", content=b"x" * 2048)
+        self.assertEqual(response.status_code, 413)
+        chunked = self.client.post("/api/sync/", content=iter([b"x" * 600] * 4))
+        self.assertEqual(chunked.status_code, 413)
+
+        self.patch_settings(SYNC_MAX_BODY_SIZE=10 * 1024 * 1024, SYNC_MAX_RECORDS=1)
+        response = self._sync("phone", [make_record(), make_record()])
+        self.assertEqual(response.status_code, 413)
+
+
+class TestDecompressBody(unittest.TestCase):
+    """Unit tests for request body decoding."""
+
+    def test_roundtrip(self) -> None:
+        """Test gzip, deflate and identity bodies decode to the original."""
+        data = b'{"records": []}' * 10
+        self.assertEqual(decompress_body(gzip.compress(data), "gzip", 1024), data)
+        self.assertEqual(decompress_body(zlib.compress(data), "deflate", 1024), data)
+        self.assertEqual(decompress_body(data, None, 1024), data)
+
+    def test_output_is_capped(self) -> None:
+        """Test a small body that expands past the limit is rejected."""
+        bomb = gzip.compress(b"\0" * (10 * 1024 * 1024))
+        with self.assertRaises(BodyTooLargeError):
+            decompress_body(bomb, "gzip", 1024 * 1024)
+
+    def test_truncated(self) -> None:
+        """Test a truncated stream is rejected."""
+        with self.assertRaises(ValueError):
+            decompress_body(gzip.compress(b"x" * 1000)[:-12], "gzip", 1024)
+
+
+class TestAddMissingColumns(unittest.TestCase):
+    """Tests for upgrading databases created before the sync columns."""
+
+    def test_columns_added_to_existing_table(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_engine(f"sqlite:///{Path(tmp) / 'old.db'}")
+            with engine.begin() as conn:
+                conn.execute(text(
+                    "CREATE TABLE predictions (id INTEGER PRIMARY KEY, "
+                    "image_path VARCHAR NOT NULL, label VARCHAR NOT NULL, "
+                    "confidence FLOAT NOT NULL, bbox_left FLOAT NOT NULL, "
+                    "bbox_top FLOAT NOT NULL, bbox_right FLOAT NOT NULL, "
+                    "bbox_bottom FLOAT NOT NULL, timestamp DATETIME, is_synced BOOLEAN)"))
+
+            init_db(engine)
+            init_db(engine)  # Idempotent
+
+            inspector = inspect(engine)
+            columns = {column["name"] for column in inspector.get_columns("predictions")}
+            self.assertTrue({"idempotency_key", "device_id"} <= columns)
+            unique = [index for index in inspector.get_indexes("predictions")
+                      if index["column_names"] == ["idempotency_key"]]
+            self.assertTrue(unique and unique[0]["unique"])
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    unittest.main()